@@ -1,49 +1,126 @@
-
 import csv
+import math
 import os
-from collections import defaultdict
+
+import csv_tail
+import record_writer
+from db_schema import SKIPPED_VOTE
 
 OUTPUT_DIR = os.path.join(os.path.dirname(__file__), 'output')
 CSV_FILE = os.path.join(OUTPUT_DIR, 'llm_response_record.csv')
 ACCURACY_FILE = os.path.join(OUTPUT_DIR, 'Accuracy.csv')
+# Per-model running totals and the byte offset already folded in, per CSV file
+STATE_FILE = os.path.join(OUTPUT_DIR, 'accuracy_state.json')
+
+# Exec-time quantiles are kept in log-spaced buckets with this relative accuracy.
+SKETCH_ACCURACY = 0.01
+_GAMMA = (1 + SKETCH_ACCURACY) / (1 - SKETCH_ACCURACY)
+
+
+def _new_model_stats():
+    return {'correct': 0, 'total': 0, 'skipped': 0, 'exec_sum': 0.0, 'exec_count': 0, 'zero_times': 0, 'buckets': {}}
+
+
+def _add_exec_time(stats, exec_time):
+    stats['exec_sum'] += exec_time
+    stats['exec_count'] += 1
+    if exec_time <= 0:
+        stats['zero_times'] += 1
+        return
+    bucket = str(math.ceil(math.log(exec_time, _GAMMA)))
+    stats['buckets'][bucket] = stats['buckets'].get(bucket, 0) + 1
+
+
+def exec_time_quantile(stats, q):
+    """Approximate q-quantile of a model's exec times (within SKETCH_ACCURACY relative error)."""
+    if not stats['exec_count']:
+        return 0
+    rank = q * (stats['exec_count'] - 1)
+    seen = stats['zero_times']
+    if rank < seen:
+        return 0.0
+    for bucket in sorted(stats['buckets'], key=int):
+        seen += stats['buckets'][bucket]
+        if rank < seen:
+            return 2 * _GAMMA ** int(bucket) / (_GAMMA + 1)
+    return 2 * _GAMMA ** max(map(int, stats['buckets'])) / (_GAMMA + 1)
+
+
+def _fold_row(models, row):
+    """Add one record to its model's totals; False (nothing added) if it lacks Model/Analysis/Majority."""
+    if any(row.get(field) is None for field in ('Model', 'Analysis', 'Majority')):
+        return False
+    stats = models.setdefault(row['Model'], _new_model_stats())
+    analysis = row['Analysis'].strip().lower()
+    majority = row['Majority'].strip().lower()
+    if analysis == SKIPPED_VOTE:
+        stats['skipped'] += 1
+        return True
+    exec_time = (row.get('Exec Time (s)') or row.get('ExecTimeSec') or '').strip()
+    try:
+        _add_exec_time(stats, float(exec_time))
+    except ValueError:
+        pass
+    if analysis == majority:
+        stats['correct'] += 1
+    stats['total'] += 1
+    return True
+
+
+def update_model_stats(csv_file=CSV_FILE):
+    """
+    Fold rows appended to csv_file since the last call into the persisted per-model totals
+    and return {model: stats}. Only bytes past the stored offset are read; a file that shrank
+    or whose first bytes changed is re-read from the start (see csv_tail). Rows lacking the
+    record columns are skipped (counted in the state's 'bad_rows' and reported) and the offset
+    still moves past them. Records still queued by this process's record_writer are written first.
+    """
+    record_writer.flush()
+    key = os.path.abspath(csv_file)
+    state = csv_tail.load_watermark(STATE_FILE, key)
+    if 'models' not in state or csv_tail.is_reset(csv_file, state):
+        state = dict(csv_tail.new_watermark(), models={})
+    bad_rows = 0
+    for rows in csv_tail.iter_appended_rows(csv_file, state):
+        for row in rows:
+            if not _fold_row(state['models'], row):
+                if not bad_rows:
+                    print(f"Warning: {csv_file} has a row without Model/Analysis/Majority; "
+                          f"skipping it: {str(row)[:80]}")
+                bad_rows += 1
+    if bad_rows:
+        state['bad_rows'] = state.get('bad_rows', 0) + bad_rows
+        print(f"Skipped {bad_rows} rows of {csv_file} without Model/Analysis/Majority "
+              f"({state['bad_rows']} so far).")
+    csv_tail.save_watermark(STATE_FILE, key, state)
+    return state['models']
+
 
 def calculate_model_accuracy_and_timing(csv_file=CSV_FILE, accuracy_file=ACCURACY_FILE):
     """
-    Calculates accuracy and average execution time for each model using llm_response_record.csv.
-    Writes results to Accuracy.csv.
+    Calculates accuracy and execution time (mean, p50, p95) for each model using llm_response_record.csv.
+    Only rows added since the previous run are read (see update_model_stats).
+    Votes skipped by early-exit voting are not counted as predictions (their answer is unknown)
+    and are reported separately. Writes results to Accuracy.csv.
     """
-    model_correct = defaultdict(int)
-    model_total = defaultdict(int)
-    model_exec_times = defaultdict(list)
-    with open(csv_file, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            model = row['Model']
-            analysis = row['Analysis'].strip().lower()
-            majority = row['Majority'].strip().lower()
-            exec_time = row.get('Exec Time (s)', row.get('ExecTimeSec', '')).strip()
-            try:
-                exec_time = float(exec_time)
-            except Exception:
-                exec_time = None
-            if analysis == majority:
-                model_correct[model] += 1
-            model_total[model] += 1
-            if exec_time is not None:
-                model_exec_times[model].append(exec_time)
+    models = update_model_stats(csv_file)
     with open(accuracy_file, 'w', newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
-        writer.writerow(['Model', 'Accuracy', 'Average Exec Time (s)', 'Total Predictions'])
-        for model in sorted(model_total.keys()):
-            total = model_total[model]
-            correct = model_correct[model]
-            accuracy = correct / total if total else 0
-            avg_exec_time = sum(model_exec_times[model]) / len(model_exec_times[model]) if model_exec_times[model] else 0
+        writer.writerow(['Model', 'Accuracy', 'Average Exec Time (s)', 'Total Predictions', 'Skipped Votes',
+                         'P50 Exec Time (s)', 'P95 Exec Time (s)'])
+        for model in sorted(models):
+            stats = models[model]
+            total = stats['total']
+            accuracy = stats['correct'] / total if total else 0
+            avg_exec_time = stats['exec_sum'] / stats['exec_count'] if stats['exec_count'] else 0
             writer.writerow([
                 model,
                 f'{accuracy:.4f}',
                 f'{avg_exec_time:.3f}',
-                total
+                total,
+                stats['skipped'],
+                f'{exec_time_quantile(stats, 0.50):.3f}',
+                f'{exec_time_quantile(stats, 0.95):.3f}'
             ])
     print(f"Accuracy and timing stats written to {accuracy_file}")
 
@@ -51,16 +128,6 @@ def get_model_accuracy_dict(csv_file=CSV_FILE):
     """
     Returns a dictionary of model: accuracy (float) from llm_response_record.csv.
     """
-    model_correct = defaultdict(int)
-    model_total = defaultdict(int)
-    with open(csv_file, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            model = row['Model']
-            analysis = row['Analysis'].strip().lower()
-            majority = row['Majority'].strip().lower()
-            if analysis == majority:
-                model_correct[model] += 1
-            model_total[model] += 1
-    return {model: (model_correct[model] / model_total[model] if model_total[model] else 0)
-            for model in model_total}
+    models = update_model_stats(csv_file)
+    return {model: (stats['correct'] / stats['total'] if stats['total'] else 0)
+            for model, stats in models.items() if stats['total']}
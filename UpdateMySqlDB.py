@@ -1,7 +1,9 @@
-def store_performance_csv_to_db():
+def store_performance_csv_to_db(use_load_data=False):
     """
     Reads output/perf_trans.csv and stores its data in the Performance table in MySQL.
     Drops and recreates the table, cleans column names, and ensures uniqueness and compatibility.
+    Columns are typed from their values (DATE for Date, DECIMAL when every value is numeric,
+    otherwise VARCHAR), with a SnapshotTime column and an index on the date.
     """
     import pandas as pd
     import mysql.connector
@@ -13,7 +15,7 @@ def store_performance_csv_to_db():
 
     # Connect to MySQL using config.json
     db_cfg = load_db_config()
-    conn = mysql.connector.connect(**db_cfg)
+    conn = mysql.connector.connect(**db_cfg, allow_local_infile=use_load_data)
     cursor = conn.cursor()
 
     # Clean DataFrame columns: replace NaN/empty with unique placeholder
@@ -27,21 +29,24 @@ def store_performance_csv_to_db():
 
     # Build unique column names for MySQL (trim to 60 chars and add index for uniqueness)
     unique_columns = [f"{col[:60]}_{i}" for i, col in enumerate(df.columns)]
-    col_defs = ', '.join([f'`{col}` VARCHAR(128)' for col in unique_columns])
+    column_types = [db_schema.sql_type_for(df[col]) for col in df.columns]
+    col_defs = ', '.join(['id INT AUTO_INCREMENT PRIMARY KEY', 'SnapshotTime DATETIME'] +
+                         [f'`{col}` {sql_type}' for col, (sql_type, _) in zip(unique_columns, column_types)])
+    date_columns = [col for col, (sql_type, _) in zip(unique_columns, column_types) if sql_type == 'DATE']
+    if date_columns:
+        col_defs += f', KEY idx_date (`{date_columns[0]}`)'
     # Drop and recreate table to ensure no old columns remain
     cursor.execute("DROP TABLE IF EXISTS Performance")
     create_table_sql = f"CREATE TABLE Performance ({col_defs})"
     cursor.execute(create_table_sql)
 
-    # Insert data
-    for _, row in df.iterrows():
-        filtered_row = [row[col] for col in df.columns]
-        placeholders = ', '.join(['%s'] * len(unique_columns))
-        insert_sql = f"INSERT INTO Performance ({', '.join([f'`{col}`' for col in unique_columns])}) VALUES ({placeholders})"
-        cursor.execute(insert_sql, tuple(filtered_row))
-
-    conn.commit()
     cursor.close()
+
+    # Insert data: convert column by column, then send the rows in bulk
+    snapshot_time = datetime.now().replace(microsecond=0)
+    converted = [[convert(value) for value in df[col].tolist()] for col, (_, convert) in zip(df.columns, column_types)]
+    rows = ((snapshot_time,) + values for values in zip(*converted))
+    bulk_insert(conn, 'Performance', ['SnapshotTime'] + unique_columns, rows, use_load_data=use_load_data)
     conn.close()
     print('Performance data stored in MySQL database.')
 import csv
@@ -51,19 +56,129 @@ from cryptography.fernet import Fernet
 import pandas as pd
 import mysql.connector
 import os
+import itertools
+import tempfile
+import time
+
+import csv_tail
+import db_schema
+import record_writer
+from datetime import datetime
+
+OUTPUT_DIR = os.path.join(os.path.dirname(__file__), 'output')
+# Byte offset of llm_response_record.csv already loaded, per CSV file and target table
+INGEST_STATE_FILE = os.path.join(OUTPUT_DIR, 'llm_ingest_state.json')
+# Rows sent to MySQL per executemany / LOAD DATA statement by bulk_insert
+BULK_CHUNK_SIZE = 1000
+# Online llm_response_record migration: ids copied per statement, seconds the atomic
+# RENAME TABLE may wait for its table lock, how many times it is tried, and how many ids
+# past the live table's last one the shadow table starts handing out (rows still to be
+# caught up after the swap keep theirs)
+MIGRATION_CHUNK_SIZE = 5000
+MIGRATION_LOCK_WAIT = 5
+MIGRATION_RENAME_ATTEMPTS = 3
+MIGRATION_ID_MARGIN = 10000
+
+LLM_RECORD_COLUMNS = db_schema.column_names('llm_response_record')
+
+
+def _llm_record_values(row):
+    return db_schema.typed_values('llm_response_record', [
+        row['Symbol'],
+        row['Model'],
+        row['Request Time'],
+        row['Prompt'],
+        row['Response Time'],
+        row['Analysis'],
+        row['Majority'],
+        row.get('Exec Time (s)', row.get('ExecTimeSec', ''))
+    ])
 
-def store_llm_responses_to_mysql(mysql_config=None, table_name='llm_response_record', csv_file=None):
+
+def _load_data_field(value):
+    # With ESCAPED BY '' an unquoted NULL is read as SQL NULL; everything else is quoted
+    if value is None:
+        return 'NULL'
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def _load_data_chunk(cursor, table_name, columns, data, ignore=False):
+    """Insert data through LOAD DATA LOCAL INFILE from a temporary CSV; returns rows added."""
+    handle = tempfile.NamedTemporaryFile('w', suffix='.csv', newline='', encoding='utf-8', delete=False)
+    try:
+        with handle:
+            handle.writelines(','.join(map(_load_data_field, values)) + '\r\n' for values in data)
+        path = handle.name.replace('\\', '/')
+        cursor.execute(f"""
+            LOAD DATA LOCAL INFILE '{path}' {'IGNORE ' if ignore else ''}INTO TABLE {table_name}
+            CHARACTER SET utf8mb4
+            FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"' ESCAPED BY ''
+            LINES TERMINATED BY '\\r\\n'
+            ({', '.join(columns)})
+        """)
+        return cursor.rowcount
+    finally:
+        os.remove(handle.name)
+
+
+def bulk_insert(conn, table_name, columns, rows, chunk_size=None, use_load_data=False, ignore=False,
+                report=True):
+    """
+    Write rows (tuples in column order, any iterable) to table_name in chunks of chunk_size
+    (default BULK_CHUNK_SIZE) with executemany, or LOAD DATA LOCAL INFILE when use_load_data
+    (the connection needs allow_local_infile=True). All chunks go in one transaction, committed at
+    the end and rolled back on error. ignore=True skips duplicate keys. Returns (rows sent,
+    rows inserted, seconds) and prints the throughput unless report is False.
+    """
+    chunk_size = chunk_size or BULK_CHUNK_SIZE
+    insert_sql = (f"INSERT {'IGNORE ' if ignore else ''}INTO {table_name} "
+                  f"({', '.join(f'`{col}`' for col in columns)}) VALUES ({', '.join(['%s'] * len(columns))})")
+    cursor = conn.cursor()
+    sent = inserted = 0
+    start = time.time()
+    rows = iter(rows)
+    try:
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                break
+            if use_load_data:
+                inserted += _load_data_chunk(cursor, table_name, [f'`{col}`' for col in columns], chunk, ignore)
+            else:
+                cursor.executemany(insert_sql, chunk)
+                inserted += cursor.rowcount
+            sent += len(chunk)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    elapsed = time.time() - start
+    if report:
+        rate = sent / elapsed if elapsed > 0 else float(sent)
+        print(f"Wrote {inserted} of {sent} rows to {table_name} in {elapsed:.2f}s ({rate:.0f} rows/sec).")
+    return sent, inserted, elapsed
+
+
+def store_llm_responses_to_mysql(mysql_config=None, table_name='llm_response_record', csv_file=None,
+                                 chunk_size=None, use_load_data=False):
     """
     Store records from output/llm_response_record.csv to a MySQL table. Creates the table if it doesn't exist.
-    Only inserts new records based on unique composite key (Symbol, Model, RequestTime, Prompt).
+    Only rows appended since the last run are read: the byte offset already ingested is kept per
+    (CSV file, database table) in output/llm_ingest_state.json. New rows are written with bulk_insert
+    (chunks of chunk_size, INSERT IGNORE so the unique key (Symbol, Model, RequestTime, PromptHash)
+    still skips duplicates), one transaction per block read from the CSV. Prints rows/sec when done.
     mysql_config: dict with keys host, user, password, database (if None, uses load_db_config)
     table_name: name of the table to store records
     csv_file: path to the CSV file (default: output/llm_response_record.csv)
+    use_load_data: send chunks with LOAD DATA LOCAL INFILE instead of executemany
+                   (needs local_infile enabled on the server)
     """
-    import mysql.connector
-    import csv
     if csv_file is None:
-        csv_file = os.path.join(os.path.dirname(__file__), 'output', 'llm_response_record.csv')
+        csv_file = os.path.join(OUTPUT_DIR, 'llm_response_record.csv')
+    # Records analyzed earlier in this process may still be queued on the background writer
+    record_writer.flush()
     if not os.path.exists(csv_file):
         print(f"CSV file not found: {csv_file}")
         return
@@ -72,65 +187,48 @@ def store_llm_responses_to_mysql(mysql_config=None, table_name='llm_response_rec
     conn = mysql.connector.connect(**db_cfg)
     cursor = conn.cursor()
     
-    # Create table if it doesn't exist (without unique constraint initially)
-    create_table_sql = f'''
-    CREATE TABLE IF NOT EXISTS {table_name} (
-        id INT AUTO_INCREMENT PRIMARY KEY,
-        Symbol VARCHAR(32),
-        Model VARCHAR(64),
-        RequestTime VARCHAR(32),
-        Prompt TEXT,
-        ResponseTime VARCHAR(32),
-        Analysis VARCHAR(32),
-        Majority VARCHAR(32),
-        ExecTimeSec VARCHAR(16)
-    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-    '''
-    cursor.execute(create_table_sql)
+    # Create the typed table if it doesn't exist
+    cursor.execute(db_schema.create_table_sql(table_name, 'llm_response_record'))
     conn.commit()
     cursor.close()
     conn.close()
     
-    # Run migration to add unique constraint (safe to run multiple times)
+    # Older tables: add the unique constraint, then convert to the typed schema (both no-ops when done)
     migrate_llm_response_table(mysql_config, table_name)
+    convert_table_to_typed(table_name, 'llm_response_record', mysql_config)
     
     # Reconnect for insert operations
-    conn = mysql.connector.connect(**db_cfg)
+    conn = mysql.connector.connect(**db_cfg, allow_local_infile=use_load_data)
     cursor = conn.cursor()
     
-    # Read CSV file and prepare data
-    with open(csv_file, 'r', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        rows = [row for row in reader]
+    state_key = f"{os.path.abspath(csv_file)}|{db_cfg['host']}/{db_cfg['database']}.{table_name}"
+    watermark = csv_tail.load_watermark(INGEST_STATE_FILE, state_key)
+    cursor.execute(f"SELECT 1 FROM {table_name} LIMIT 1")
+    if cursor.fetchone() is None and watermark['offset']:
+        # The table was emptied or recreated since the last run: load the whole file again
+        print(f"{table_name} is empty; re-ingesting {csv_file} from the start.")
+        watermark = csv_tail.new_watermark()
     
-    # Insert data using INSERT IGNORE to skip duplicates
-    insert_sql = f'''
-        INSERT IGNORE INTO {table_name}
-        (Symbol, Model, RequestTime, Prompt, ResponseTime, Analysis, Majority, ExecTimeSec)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-    '''
-    data = [
-        (
-            row['Symbol'],
-            row['Model'],
-            row['Request Time'],
-            row['Prompt'],
-            row['Response Time'],
-            row['Analysis'],
-            row['Majority'],
-            row.get('Exec Time (s)', row.get('ExecTimeSec', ''))
-        )
-        for row in rows
-    ]
-    
-    if data:
-        cursor.executemany(insert_sql, data)
-        conn.commit()
-        print(f"Inserted {cursor.rowcount} new records into {table_name} (duplicates skipped).")
+    cursor.close()
+    rows_read = inserted = 0
+    start = time.time()
+    for rows in csv_tail.iter_appended_rows(csv_file, watermark):
+        sent, added, _ = bulk_insert(conn, table_name, LLM_RECORD_COLUMNS, map(_llm_record_values, rows),
+                                     chunk_size, use_load_data, ignore=True, report=False)
+        rows_read += sent
+        inserted += added
+        # Rows up to the watermark are committed; a rerun after a failure resumes from here
+        csv_tail.save_watermark(INGEST_STATE_FILE, state_key, watermark)
+    csv_tail.save_watermark(INGEST_STATE_FILE, state_key, watermark)
+    elapsed = time.time() - start
+    
+    if rows_read:
+        rate = rows_read / elapsed if elapsed > 0 else float(rows_read)
+        print(f"Inserted {inserted} new records into {table_name} from {rows_read} new CSV rows "
+              f"(duplicates skipped) in {elapsed:.2f}s, {rate:.0f} rows/sec.")
     else:
         print("No records to insert.")
     
-    cursor.close()
     conn.close()
 
 # Load DB config from config.json with encrypted password
@@ -148,12 +246,28 @@ def load_db_config(config_path='config.json'):
     }
     return db_config
 
-OUTPUT_DIR = os.path.join(os.path.dirname(__file__), 'output')
+def _insert_holdings_csv(csv_file, table_name, kind, db_params=None, use_load_data=False):
+    """Create/convert the typed table and bulk insert every CSV row as one snapshot."""
+    db_cfg = db_params if db_params else load_db_config()
+    convert_table_to_typed(table_name, kind, db_cfg)
+    conn = mysql.connector.connect(**db_cfg, allow_local_infile=use_load_data)
+    cursor = conn.cursor()
+    cursor.execute(db_schema.create_table_sql(table_name, kind))
+    cursor.close()
+    snapshot_time = datetime.now().replace(microsecond=0)
+    width = len(db_schema.SCHEMAS[kind]['columns'])
+    with open(csv_file, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader)  # skip header
+        rows = (db_schema.typed_values(kind, row[:width], snapshot_time) for row in reader)
+        bulk_insert(conn, table_name, db_schema.column_names(kind), rows, use_load_data=use_load_data)
+    conn.close()
 
 def insert_robinhood_holdings(
     csv_file=os.path.join(OUTPUT_DIR, 'holdings_report.csv'),
     table_name='robinhood_holdings',
-    db_params=None
+    db_params=None,
+    use_load_data=False
 ):
     """
     Create the robinhood_holdings table if not exists and insert records from the given CSV file.
@@ -161,44 +275,16 @@ def insert_robinhood_holdings(
         csv_file (str): Path to the Robinhood holdings CSV file.
         table_name (str): Name of the MySQL table to insert into.
         db_params (dict): Optional DB connection params (default: use db_config).
+        use_load_data (bool): Send rows with LOAD DATA LOCAL INFILE instead of executemany.
     """
-    schema = f"""
-    CREATE TABLE IF NOT EXISTS {table_name} (
-        Symbol VARCHAR(32),
-        Quantity VARCHAR(32),
-        Price VARCHAR(32),
-        Equity VARCHAR(32),
-        Percent_Change VARCHAR(32),
-        Type VARCHAR(32),
-        Beta VARCHAR(16),
-        Trend VARCHAR(32)
-    )
-    """
-    insert_stmt = f"""
-    INSERT INTO {table_name} (
-        Symbol, Quantity, Price, Equity, Percent_Change, Type, Beta, Trend
-    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-    """
-    db_cfg = db_params if db_params else load_db_config()
-    conn = mysql.connector.connect(**db_cfg)
-    cursor = conn.cursor()
-    cursor.execute(schema)
-    with open(csv_file, newline='', encoding='utf-8') as f:
-        reader = csv.reader(f)
-        header = next(reader)  # skip header
-        for row in reader:
-            if len(row) < 8:
-                row += [''] * (8 - len(row))
-            cursor.execute(insert_stmt, row)
-    conn.commit()
-    cursor.close()
-    conn.close()
+    _insert_holdings_csv(csv_file, table_name, 'robinhood_holdings', db_params, use_load_data)
     print(f"Robinhood records from {csv_file} inserted into {table_name} successfully.")
 
 def insert_brokerage_holdings(
     csv_file=os.path.join(OUTPUT_DIR, 'holdings_cleaned.csv'),
     table_name='holdings',
-    db_params=None
+    db_params=None,
+    use_load_data=False
 ):
     """
     Create the holdings table if not exists and insert records from the given CSV file.
@@ -206,45 +292,9 @@ def insert_brokerage_holdings(
         csv_file (str): Path to the brokerage holdings CSV file.
         table_name (str): Name of the MySQL table to insert into.
         db_params (dict): Optional DB connection params (default: use db_config).
+        use_load_data (bool): Send rows with LOAD DATA LOCAL INFILE instead of executemany.
     """
-    schema = f"""
-    CREATE TABLE IF NOT EXISTS {table_name} (
-        Ticker VARCHAR(32),
-        Symbol_Description VARCHAR(128),
-        Empty1 VARCHAR(8),
-        Quantity VARCHAR(32),
-        Price VARCHAR(32),
-        Days_Change VARCHAR(32),
-        Value VARCHAR(32),
-        Days_Value_Change VARCHAR(32),
-        Unrealized_Gain_Loss VARCHAR(64),
-        Last_Updated VARCHAR(32),
-        Empty2 VARCHAR(8),
-        Beta VARCHAR(16),
-        Trend VARCHAR(32),
-        Exported_On VARCHAR(32)
-    )
-    """
-    insert_stmt = f"""
-    INSERT INTO {table_name} (
-        Ticker, Symbol_Description, Empty1, Quantity, Price, Days_Change, Value,
-        Days_Value_Change, Unrealized_Gain_Loss, Last_Updated, Empty2, Beta, Trend, Exported_On
-    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-    """
-    db_cfg = db_params if db_params else load_db_config()
-    conn = mysql.connector.connect(**db_cfg)
-    cursor = conn.cursor()
-    cursor.execute(schema)
-    with open(csv_file, newline='', encoding='utf-8') as f:
-        reader = csv.reader(f)
-        header = next(reader)  # skip header
-        for row in reader:
-            if len(row) < 14:
-                row += [''] * (14 - len(row))
-            cursor.execute(insert_stmt, row)
-    conn.commit()
-    cursor.close()
-    conn.close()
+    _insert_holdings_csv(csv_file, table_name, 'holdings', db_params, use_load_data)
     print(f"Brokerage records from {csv_file} inserted into {table_name} successfully.")
 
 def delete_holdings_table(table_name='holdings', db_params=None):
@@ -300,12 +350,68 @@ def kill_other_db_connections(mysql_config=None, exclude_current=True):
     cursor.close()
     conn.close()
 
-def migrate_llm_response_table(mysql_config=None, table_name='llm_response_record'):
+def _copy_id_range(cursor, source, target, first_id, last_id):
+    """INSERT IGNORE rows with first_id <= id <= last_id from source into target; returns rows added."""
+    columns = ', '.join(['id'] + [name for name, _, _ in db_schema.SCHEMAS['llm_response_record']['columns']])
+    cursor.execute(f"""
+        INSERT IGNORE INTO {target} ({columns}, PromptHash)
+        SELECT {columns}, SHA2(Prompt, 256) FROM {source}
+        WHERE id BETWEEN %s AND %s ORDER BY id
+    """, (first_id, last_id))
+    return cursor.rowcount
+
+
+def _swap_tables(conn, table_name, shadow_table, old_table, reserve_ids=True):
     """
-    One-time migration: Drop and recreate table with UNIQUE constraint.
-    Safe to run multiple times (checks if constraint already exists).
+    Atomically rename table_name to old_table and shadow_table to table_name; False if the lock never came.
+    With reserve_ids (table_name has an id column), the shadow's AUTO_INCREMENT is first moved
+    MIGRATION_ID_MARGIN past table_name's last id before each attempt, so writers inserting right
+    after the rename cannot take the ids of the rows still to be caught up from old_table.
     """
-    import mysql.connector
+    cursor = conn.cursor()
+    try:
+        for attempt in range(1, MIGRATION_RENAME_ATTEMPTS + 1):
+            if reserve_ids:
+                cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table_name}")
+                next_id = cursor.fetchone()[0] + MIGRATION_ID_MARGIN
+                cursor.execute(f"ALTER TABLE {shadow_table} AUTO_INCREMENT = {next_id}")
+            try:
+                cursor.execute(f"RENAME TABLE {table_name} TO {old_table}, {shadow_table} TO {table_name}")
+                return True
+            except mysql.connector.Error as e:
+                # A long wait would queue new readers behind the pending rename
+                print(f"RENAME TABLE attempt {attempt} could not get the table lock: {e}")
+                time.sleep(attempt)
+    finally:
+        cursor.close()
+    print(f"Migration aborted; {table_name} is unchanged. Rerun later.")
+    return False
+
+
+def _missing_llm_records(cursor, source, target, first_id, last_id):
+    """Rows of source with first_id <= id <= last_id that have no row with the same unique key in target."""
+    cursor.execute(f"""
+        SELECT COUNT(*) FROM {source} s
+        WHERE s.id BETWEEN %s AND %s AND NOT EXISTS (
+            SELECT 1 FROM {target} t
+            WHERE t.Symbol <=> s.Symbol AND t.Model <=> s.Model
+            AND t.RequestTime <=> s.RequestTime AND t.PromptHash <=> SHA2(s.Prompt, 256))
+    """, (first_id, last_id))
+    return cursor.fetchone()[0]
+
+
+def migrate_llm_response_table(mysql_config=None, table_name='llm_response_record', chunk_size=None):
+    """
+    Online migration adding the UNIQUE key (Symbol, Model, RequestTime, PromptHash) without losing records.
+    Builds a shadow table with the key, copies the live table into it in id-ordered chunks
+    (INSERT IGNORE keeps the first row of each duplicate group and preserves ids), catches up on
+    rows written meanwhile and swaps the tables with one atomic RENAME TABLE. Readers of the live
+    table are never blocked by the copy (plain SELECTs are non-locking reads) and only wait for the
+    brief rename. The old table is dropped only once every row caught up after the swap is in the
+    live table; otherwise it is kept and reported. Safe to run multiple times (checks if constraint
+    already exists).
+    """
+    chunk_size = chunk_size or MIGRATION_CHUNK_SIZE
     db_cfg = mysql_config if mysql_config else load_db_config()
     
     conn = mysql.connector.connect(**db_cfg)
@@ -334,37 +440,16 @@ def migrate_llm_response_table(mysql_config=None, table_name='llm_response_recor
         conn.close()
         return
     
-    # Get total record count
-    cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-    total_records = cursor.fetchone()[0]
-    print(f"Total records in {table_name}: {total_records}")
+    shadow_table = f"{table_name}_shadow"
+    old_table = f"{table_name}_old"
+    # Source rows are read without shared locks; only the shadow table is locked
+    cursor.execute("SET SESSION TRANSACTION ISOLATION LEVEL READ COMMITTED")
+    cursor.execute(f"SET SESSION lock_wait_timeout = {MIGRATION_LOCK_WAIT}")
     
-    cursor.close()
-    conn.close()
-    
-    # Kill other connections before dropping table
-    print("Killing other database connections to avoid locks...")
-    kill_other_db_connections(mysql_config)
-    
-    # Reconnect and drop table
-    conn = mysql.connector.connect(**db_cfg)
-    cursor = conn.cursor()
-    
-    print(f"Dropping and recreating {table_name} with UNIQUE constraint...")
-    
-    # Disable foreign key checks for faster drop
-    cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
-    conn.commit()
-    
-    cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
-    conn.commit()
-    
-    # Re-enable foreign key checks
-    cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
-    
-    # Recreate table with UNIQUE constraint
+    # A shadow left by an interrupted run holds no live data
+    cursor.execute(f"DROP TABLE IF EXISTS {shadow_table}")
     create_table_sql = f'''
-    CREATE TABLE {table_name} (
+    CREATE TABLE {shadow_table} (
         id INT AUTO_INCREMENT PRIMARY KEY,
         Symbol VARCHAR(32),
         Model VARCHAR(64),
@@ -374,61 +459,191 @@ def migrate_llm_response_table(mysql_config=None, table_name='llm_response_recor
         Analysis VARCHAR(32),
         Majority VARCHAR(32),
         ExecTimeSec VARCHAR(16),
-        UNIQUE KEY unique_record (Symbol, Model, RequestTime)
+        PromptHash CHAR(64),
+        UNIQUE KEY unique_record (Symbol, Model, RequestTime, PromptHash)
     ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
     '''
     cursor.execute(create_table_sql)
     conn.commit()
-    print(f"Table {table_name} recreated with UNIQUE constraint. All {total_records} old records removed.")
+    
+    cursor.execute(f"SELECT COUNT(*), COALESCE(MIN(id), 1), COALESCE(MAX(id), 0) FROM {table_name}")
+    total_records, first_id, last_id = cursor.fetchone()
+    print(f"Copying {total_records} records from {table_name} into {shadow_table} in chunks of {chunk_size} ids...")
+    
+    start = time.time()
+    copied = 0
+    copied_to = first_id - 1
+    # Repeat until no rows arrived during the last pass
+    while copied_to < last_id:
+        for chunk_start in range(copied_to + 1, last_id + 1, chunk_size):
+            chunk_end = min(chunk_start + chunk_size - 1, last_id)
+            copied += _copy_id_range(cursor, table_name, shadow_table, chunk_start, chunk_end)
+            conn.commit()
+        copied_to = last_id
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table_name}")
+        last_id = cursor.fetchone()[0]
+    
+    if not _swap_tables(conn, table_name, shadow_table, old_table):
+        cursor.close()
+        conn.close()
+        return
+    
+    # Rows written to the old table between the last pass and the swap
+    cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {old_table}")
+    final_id = cursor.fetchone()[0]
+    if final_id > copied_to:
+        copied += _copy_id_range(cursor, old_table, table_name, copied_to + 1, final_id)
+        conn.commit()
+        # Every caught-up row must now be in the live table (itself or an earlier duplicate)
+        missing = _missing_llm_records(cursor, old_table, table_name, copied_to + 1, final_id)
+        if missing:
+            print(f"{missing} records with ids {copied_to + 1}-{final_id} did not reach {table_name}; "
+                  f"kept {old_table} for them. Copy them over, then drop {old_table}.")
+            cursor.close()
+            conn.close()
+            return
+    cursor.execute(f"DROP TABLE {old_table}")
+    conn.commit()
+    print(f"Table {table_name} swapped in with UNIQUE constraint: {copied} records kept, "
+          f"duplicates removed, in {time.time() - start:.2f}s.")
     
     cursor.close()
     conn.close()
 
+def convert_table_to_typed(table_name, kind, db_params=None, chunk_size=None):
+    """
+    Convert an existing all-VARCHAR (or older typed) table to the typed schema in db_schema.SCHEMAS[kind]
+    (DECIMAL/DATETIME/ENUM columns, SnapshotTime, secondary indexes). Rows are read in chunks,
+    converted (unparseable values become NULL) and written to a shadow table that replaces the
+    original with one atomic RENAME TABLE, as in migrate_llm_response_table. Tables with an id
+    column are copied online, in id order with catch-up passes for rows written meanwhile; the old
+    table is kept (and reported) if any row caught up after the swap could not be inserted.
+    Tables without one (legacy holdings) cannot be caught up and need a quiet table: run it while
+    no holdings load is running. If the row count changes during their copy the conversion is
+    abandoned and the table left as it was.
+    Does nothing if the table does not exist or is already typed.
+    """
+    chunk_size = chunk_size or MIGRATION_CHUNK_SIZE
+    db_cfg = db_params if db_params else load_db_config()
+    schema = db_schema.SCHEMAS[kind]
+    
+    conn = mysql.connector.connect(**db_cfg)
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("""
+        SELECT COLUMN_NAME AS name, DATA_TYPE AS type FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s
+    """, (table_name,))
+    column_types = {row['name'].lower(): row['type'].lower() for row in cursor.fetchall()}
+    if not column_types or db_schema.is_typed(column_types, kind):
+        cursor.close()
+        conn.close()
+        return
+    
+    shadow_table = f"{table_name}_shadow"
+    old_table = f"{table_name}_old"
+    cursor.execute("SET SESSION TRANSACTION ISOLATION LEVEL READ COMMITTED")
+    cursor.execute(f"SET SESSION lock_wait_timeout = {MIGRATION_LOCK_WAIT}")
+    cursor.execute(f"DROP TABLE IF EXISTS {shadow_table}")
+    cursor.execute(db_schema.create_table_sql(shadow_table, kind, if_not_exists=False))
+    conn.commit()
+    
+    names = [name for name, _, _ in schema['columns']]
+    legacy_columns = [name for name in names if name.lower() in column_types]
+    has_id = 'id' in column_types
+    select_columns = ', '.join((['id'] if has_id else []) + legacy_columns)
+    insert_columns = db_schema.column_names(kind) + (['id'] if has_id else [])
+    insert_sql = (f"INSERT IGNORE INTO {shadow_table} ({', '.join(insert_columns)}) "
+                  f"VALUES ({', '.join(['%s'] * len(insert_columns))})")
+    
+    def convert(row):
+        snapshot = db_schema.to_datetime(row.get(schema['legacy_snapshot'])) if schema['legacy_snapshot'] else None
+        values = db_schema.typed_values(kind, [row.get(name) for name in names], snapshot)
+        return values + ((row['id'],) if has_id else ())
+    
+    def copy_after(source, target, after_id):
+        # Keyset-paginated copy of rows with id > after_id; returns (rows copied, rows inserted, last id)
+        copied = inserted = 0
+        while True:
+            cursor.execute(f"SELECT {select_columns} FROM {source} WHERE id > %s ORDER BY id LIMIT %s",
+                           (after_id, chunk_size))
+            rows = cursor.fetchall()
+            if not rows:
+                return copied, inserted, after_id
+            cursor.executemany(insert_sql.replace(shadow_table, target, 1), [convert(row) for row in rows])
+            inserted += cursor.rowcount
+            conn.commit()
+            copied += len(rows)
+            after_id = rows[-1]['id']
+    
+    print(f"Converting {table_name} to the typed schema...")
+    start = time.time()
+    if has_id:
+        copied, _, last_id = copy_after(table_name, shadow_table, 0)
+    else:
+        # Holdings snapshots have no key to resume from; stream them on a second connection
+        reader_conn = mysql.connector.connect(**db_cfg)
+        reader = reader_conn.cursor(dictionary=True)
+        reader.execute(f"SELECT {select_columns} FROM {table_name}")
+        copied = 0
+        while True:
+            rows = reader.fetchmany(chunk_size)
+            if not rows:
+                break
+            cursor.executemany(insert_sql, [convert(row) for row in rows])
+            conn.commit()
+            copied += len(rows)
+        reader.close()
+        reader_conn.close()
+        cursor.execute(f"SELECT COUNT(*) AS n FROM {table_name}")
+        if cursor.fetchone()['n'] != copied:
+            print(f"{table_name} was written to during the conversion; it is unchanged. "
+                  f"Rerun when no holdings load is running.")
+            cursor.execute(f"DROP TABLE {shadow_table}")
+            cursor.close()
+            conn.close()
+            return
+    
+    if not _swap_tables(conn, table_name, shadow_table, old_table, reserve_ids=has_id):
+        cursor.close()
+        conn.close()
+        return
+    if has_id:
+        # Rows written to the old table between the last pass and the swap; each must be
+        # inserted (none may lose its id to a writer on the new table) before the old one goes
+        caught_up, inserted, _ = copy_after(old_table, table_name, last_id)
+        copied += inserted
+        if inserted != caught_up:
+            print(f"{caught_up - inserted} of {caught_up} records written to {table_name} during the "
+                  f"conversion were not copied; kept {old_table} for them. Copy them over, then drop {old_table}.")
+            cursor.close()
+            conn.close()
+            return
+    cursor.execute(f"DROP TABLE {old_table}")
+    conn.commit()
+    elapsed = time.time() - start
+    print(f"Converted {copied} records of {table_name} to the typed schema in {elapsed:.2f}s.")
+    
+    cursor.close()
+    conn.close()
+
+
+def convert_all_tables_to_typed(db_params=None):
+    """Converter for existing data: bring every typed table in db_schema.SCHEMAS up to date."""
+    for table_name in db_schema.SCHEMAS:
+        convert_table_to_typed(table_name, table_name, db_params)
+
 # Optionally, keep the main() for CLI usage, but now only for both tables
 def main():
 #    delete_holdings_table('holdings')
     # Insert holdings_cleaned.csv into 'holdings' table
     table_name = 'holdings'
     csv_file = 'holdings_cleaned.csv'
-    table_schema = f"""
-    CREATE TABLE IF NOT EXISTS {table_name} (
-        Ticker VARCHAR(32),
-        Symbol_Description VARCHAR(128),
-        Empty1 VARCHAR(8),
-        Quantity VARCHAR(32),
-        Price VARCHAR(32),
-        Days_Change VARCHAR(32),
-        Value VARCHAR(32),
-        Days_Value_Change VARCHAR(32),
-        Unrealized_Gain_Loss VARCHAR(64),
-        Last_Updated VARCHAR(32),
-        Empty2 VARCHAR(8),
-        Beta VARCHAR(16),
-        Trend VARCHAR(32),
-        Exported_On VARCHAR(32)
-    )
-    """
-    insert_stmt = f"""
-    INSERT INTO {table_name} (
-        Ticker, Symbol_Description, Empty1, Quantity, Price, Days_Change, Value,
-        Days_Value_Change, Unrealized_Gain_Loss, Last_Updated, Empty2, Beta, Trend, Exported_On
-    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-    """
-    db_config = load_db_config()
-    conn = mysql.connector.connect(**db_config)
-    cursor = conn.cursor()
-    cursor.execute(table_schema)
-    with open(csv_file, newline='', encoding='utf-8') as f:
-        reader = csv.reader(f)
-        header = next(reader)  # skip header
-        for row in reader:
-            if len(row) < 14:
-                row += [''] * (14 - len(row))
-            cursor.execute(insert_stmt, row)
-    conn.commit()
-    cursor.close()
-    conn.close()
+    _insert_holdings_csv(csv_file, table_name, 'holdings')
     print(f"Records from {csv_file} inserted into {table_name} successfully.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import sys
+    if "--convert-schema" in sys.argv:
+        convert_all_tables_to_typed()
+    else:
+        main()
\ No newline at end of file
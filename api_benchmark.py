@@ -0,0 +1,207 @@
+import asyncio
+import time
+
+import anyio.to_thread
+
+import httpx
+import numpy as np
+
+import db_pool
+
+# Load test for fastapi_service comparing the sync (threadpool) and async (event loop)
+# endpoints. Against a running service (--url) it measures the real database; without
+# --url it serves the app in-process with fake pools whose queries take --latency seconds,
+# so the threadpool cap on the sync endpoints shows up without a MySQL server.
+
+PATHS = {
+    'sync': '/llm_responses/?limit=10',
+    'async': '/async/llm_responses/?limit=10',
+}
+FAKE_ROWS = [{'id': n, 'Symbol': 'SYM', 'Model': 'gemma3:1b', 'Analysis': 'neutral', 'Majority': 'neutral'}
+             for n in range(10)]
+
+
+class _FakeCursor:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def execute(self, query, params=()):
+        time.sleep(self.latency)
+
+    def fetchall(self):
+        return list(FAKE_ROWS)
+
+    def close(self):
+        pass
+
+
+class _FakeConnection:
+    unread_result = False
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def cursor(self, **kwargs):
+        return _FakeCursor(self.latency)
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeDBPool(db_pool.DBPool):
+    """DBPool whose connections answer every query with FAKE_ROWS after `latency` seconds."""
+
+    def __init__(self, latency, size):
+        super().__init__({}, size=size)
+        self.latency = latency
+
+    def _connect(self):
+        with self._lock:
+            self.stats['connects'] += 1
+        return _FakeConnection(self.latency)
+
+
+class _FakeAsyncCursor:
+    def __init__(self, latency):
+        self.latency = latency
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def execute(self, query, params=()):
+        await asyncio.sleep(self.latency)
+
+    async def fetchall(self):
+        return list(FAKE_ROWS)
+
+
+class _FakeAsyncConnection:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def cursor(self):
+        return _FakeAsyncCursor(self.latency)
+
+
+class FakeAsyncPool:
+    """Stand-in for an aiomysql pool (acquire/release, size counters) with simulated query latency."""
+
+    def __init__(self, latency, size):
+        self.latency = latency
+        self.maxsize = size
+        self.size = 0
+        self.freesize = 0
+        self._free = []
+        self._slots = None
+
+    async def acquire(self):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.maxsize)
+        await self._slots.acquire()
+        if self._free:
+            self.freesize -= 1
+            return self._free.pop()
+        self.size += 1
+        return _FakeAsyncConnection(self.latency)
+
+    def release(self, conn):
+        self._free.append(conn)
+        self.freesize += 1
+        self._slots.release()
+
+    def close(self):
+        pass
+
+    async def wait_closed(self):
+        pass
+
+
+def percentiles(latencies):
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {'p50': p50, 'p95': p95, 'p99': p99}
+
+
+async def run_load(client, path, requests, concurrency):
+    """Send `requests` GETs to path with `concurrency` in flight. Returns (seconds, latencies, errors)."""
+    latencies, errors = [], 0
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(None)
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            queue.get_nowait()
+            t0 = time.perf_counter()
+            try:
+                response = await client.get(path)
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start, latencies, errors
+
+
+async def _benchmark(url, modes, requests, concurrency, latency, pool_size):
+    if url:
+        client = httpx.AsyncClient(base_url=url, timeout=60, limits=httpx.Limits(max_connections=concurrency))
+    else:
+        import fastapi_service
+        app = fastapi_service.app
+        app.state.db_pool = FakeDBPool(latency, pool_size)
+        app.state.async_pool = FakeAsyncPool(latency, pool_size)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://benchmark', timeout=60)
+    results = {}
+    # Sync endpoints share this many worker threads (only meaningful for the in-process app)
+    threads = int(anyio.to_thread.current_default_thread_limiter().total_tokens)
+    async with client:
+        for mode in modes:
+            await run_load(client, PATHS[mode], min(concurrency, requests), concurrency)  # warm up the pools
+            results[mode] = await run_load(client, PATHS[mode], requests, concurrency)
+    return results, threads
+
+
+def run_benchmark(url=None, modes=('sync', 'async'), requests=500, concurrency=100, latency=0.2, pool_size=64):
+    """
+    Run every mode with `concurrency` clients and print req/s, p50/p95/p99 latency and errors.
+    Without url the app runs in-process on fake pools of pool_size connections (both modes get
+    the same pool size, so the difference is the sync threadpool limit).
+    """
+    results, threads = asyncio.run(_benchmark(url, modes, requests, concurrency, latency, pool_size))
+    target = url or (f"in-process app, {latency * 1000:.0f} ms simulated query, pool size {pool_size}, "
+                     f"sync threadpool limit {threads}")
+    print(f"\nAPI benchmark: {requests} requests, concurrency {concurrency} ({target})")
+    print(f"{'Mode':<8}{'Req/s':>9}{'p50 (ms)':>10}{'p95 (ms)':>10}{'p99 (ms)':>10}{'Errors':>8}")
+    for mode, (elapsed, latencies, errors) in results.items():
+        q = percentiles(latencies)
+        print(f"{mode:<8}{requests / elapsed:>9.1f}{q['p50'] * 1000:>10.1f}{q['p95'] * 1000:>10.1f}"
+              f"{q['p99'] * 1000:>10.1f}{errors:>8}")
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+
+    def option(name, default, cast):
+        if name in sys.argv:
+            return cast(sys.argv[sys.argv.index(name) + 1])
+        return default
+
+    run_benchmark(
+        url=option("--url", None, str),
+        modes=option("--modes", "sync,async", str).split(","),
+        requests=option("--requests", 500, int),
+        concurrency=option("--concurrency", 100, int),
+        latency=option("--latency", 0.2, float),
+        pool_size=option("--pool-size", 64, int),
+    )
@@ -0,0 +1,119 @@
+import csv
+import hashlib
+import io
+import json
+import os
+
+# Incremental reading of append-only CSV logs such as llm_response_record.csv.
+# A watermark records the byte offset already consumed (always a record boundary), the
+# header, and a fingerprint of the file's first bytes so a replaced or truncated file is
+# re-read from the start.
+
+BLOCK_SIZE = 1 << 20
+_FINGERPRINT_BYTES = 4096
+
+
+def _fingerprint(csv_file):
+    with open(csv_file, 'rb') as f:
+        return hashlib.sha256(f.read(_FINGERPRINT_BYTES)).hexdigest()
+
+
+def new_watermark():
+    return {'offset': 0, 'fingerprint': None, 'header': None, 'terminator': None}
+
+
+def load_watermark(state_file, key):
+    """Watermark stored under key in the JSON state_file (a fresh one if missing)."""
+    try:
+        with open(state_file, 'r', encoding='utf-8') as f:
+            return json.load(f).get(key) or new_watermark()
+    except Exception:
+        return new_watermark()
+
+
+def save_watermark(state_file, key, watermark):
+    try:
+        with open(state_file, 'r', encoding='utf-8') as f:
+            states = json.load(f)
+    except Exception:
+        states = {}
+    states[key] = watermark
+    with open(state_file, 'w', encoding='utf-8') as f:
+        json.dump(states, f)
+
+
+def is_reset(csv_file, watermark):
+    """True when csv_file no longer continues the data the watermark was taken from."""
+    if watermark['offset'] == 0:
+        return False
+    if os.path.getsize(csv_file) < watermark['offset']:
+        return True
+    return watermark['offset'] >= _FINGERPRINT_BYTES and watermark['fingerprint'] != _fingerprint(csv_file)
+
+
+def _record_ends(data, terminator):
+    """
+    Offsets just past each complete record in data, which starts at a record boundary.
+    csv.writer quotes every field holding a line break or a quote and doubles the quotes
+    inside it, so a terminator ends a record only where the quotes before it are balanced;
+    one inside a quoted field (e.g. a news summary with \\r\\n) does not.
+    """
+    ends = []
+    start = 0
+    quoted = False
+    while True:
+        line_end = data.find(terminator, start)
+        if line_end < 0:
+            return ends
+        quoted ^= data.count(b'"', start, line_end) % 2 == 1
+        start = line_end + len(terminator)
+        if not quoted:
+            ends.append(start)
+
+
+def iter_appended_rows(csv_file, watermark, block_size=BLOCK_SIZE):
+    """
+    Yield lists of row dicts appended to csv_file after watermark['offset'], reading
+    block_size bytes at a time and stopping at the last complete record (line breaks inside
+    quoted fields do not end a record). Records whose field count does not match the header
+    are skipped with a warning. The watermark is advanced in place to the end of each block's
+    last record before its rows are yielded, so saving it once they are stored is safe.
+    """
+    if is_reset(csv_file, watermark):
+        watermark.update(new_watermark())
+    with open(csv_file, 'rb') as f:
+        f.seek(watermark['offset'])
+        pending = b''
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            pending += block
+            if watermark.get('terminator') is None:
+                # Records end the way the header line does
+                line_end = pending.find(b'\n')
+                if line_end < 0:
+                    continue
+                watermark['terminator'] = '\r\n' if pending[line_end - 1:line_end] == b'\r' else '\n'
+            ends = _record_ends(pending, watermark['terminator'].encode())
+            if not ends:
+                continue
+            cut = ends[-1]
+            text, pending = pending[:cut].decode('utf-8'), pending[cut:]
+            reader = csv.reader(io.StringIO(text, newline=''))
+            if watermark['header'] is None:
+                watermark['header'] = next(reader, None)
+            rows = []
+            for values in reader:
+                if not values:
+                    continue
+                if len(values) != len(watermark['header']):
+                    print(f"Warning: skipping malformed record in {csv_file} ({len(values)} fields, "
+                          f"expected {len(watermark['header'])}): {str(values)[:80]}")
+                    continue
+                rows.append(dict(zip(watermark['header'], values)))
+            watermark['offset'] += cut
+            watermark['fingerprint'] = _fingerprint(csv_file)
+            if rows:
+                yield rows
+    watermark['fingerprint'] = _fingerprint(csv_file)
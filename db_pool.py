@@ -0,0 +1,173 @@
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+
+import mysql.connector
+
+# Application-lifetime MySQL connection pools for the API services. Connections are
+# opened lazily up to POOL_SIZE, reused LIFO, pinged before reuse when they have been
+# idle longer than HEALTH_CHECK_INTERVAL, and dropped when a query on them fails.
+
+POOL_SIZE = 8                # connections open at most
+POOL_TIMEOUT = 5.0           # seconds a request waits for a free connection
+CONNECT_TIMEOUT = 5          # seconds to open a new connection
+HEALTH_CHECK_INTERVAL = 30   # idle seconds after which a connection is pinged before reuse
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the pool timeout."""
+
+
+class DBPool:
+    """Bounded pool of autocommit mysql.connector connections with usage stats."""
+
+    def __init__(self, db_config, size=POOL_SIZE, timeout=POOL_TIMEOUT, connect_timeout=CONNECT_TIMEOUT,
+                 health_check_interval=HEALTH_CHECK_INTERVAL):
+        self.db_config = dict(db_config)
+        self.size = size
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.health_check_interval = health_check_interval
+        self.stats = {'checkouts': 0, 'connects': 0, 'health_checks': 0, 'discarded': 0, 'timeouts': 0,
+                      'wait_seconds': 0.0, 'max_wait_seconds': 0.0}
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._idle = []  # (connection, time returned)
+        self._in_use = 0
+
+    def _connect(self):
+        conn = mysql.connector.connect(**self.db_config, connection_timeout=self.connect_timeout)
+        # Each query sees the latest committed data instead of a snapshot held open by a pooled connection
+        conn.autocommit = True
+        with self._lock:
+            self.stats['connects'] += 1
+        return conn
+
+    def _take(self):
+        with self._lock:
+            conn, returned = self._idle.pop() if self._idle else (None, 0)
+        if conn is None:
+            return self._connect()
+        if time.time() - returned > self.health_check_interval:
+            with self._lock:
+                self.stats['health_checks'] += 1
+            try:
+                conn.ping(reconnect=False)
+            except mysql.connector.Error:
+                # Server closed it (e.g. wait_timeout); replace it with a fresh connection
+                self._discard(conn)
+                return self._connect()
+        return conn
+
+    def _discard(self, conn):
+        with self._lock:
+            self.stats['discarded'] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the with-block; raises PoolTimeout when none frees up in time."""
+        start = time.time()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self.stats['timeouts'] += 1
+            raise PoolTimeout(f"No database connection free within {self.timeout}s (pool size {self.size})")
+        waited = time.time() - start
+        with self._lock:
+            self.stats['checkouts'] += 1
+            self.stats['wait_seconds'] += waited
+            self.stats['max_wait_seconds'] = max(self.stats['max_wait_seconds'], waited)
+            self._in_use += 1
+        conn = None
+        try:
+            conn = self._take()
+            yield conn
+        except mysql.connector.Error:
+            # The connection may be broken; do not hand it out again
+            if conn is not None:
+                self._discard(conn)
+                conn = None
+            raise
+        finally:
+            if conn is not None and getattr(conn, 'unread_result', False):
+                # A result set was left half-read; the connection cannot run another query
+                self._discard(conn)
+                conn = None
+            if conn is not None:
+                with self._lock:
+                    self._idle.append((conn, time.time()))
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+
+    def health(self):
+        """Run SELECT 1 on a pooled connection; returns {'status', 'latency_ms'[, 'error']}."""
+        start = time.time()
+        try:
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+                cursor.close()
+        except (PoolTimeout, mysql.connector.Error) as e:
+            return {'status': 'unhealthy', 'latency_ms': round((time.time() - start) * 1000, 2), 'error': str(e)}
+        return {'status': 'healthy', 'latency_ms': round((time.time() - start) * 1000, 2)}
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self.stats)
+            in_use, idle = self._in_use, len(self._idle)
+        stats['avg_wait_seconds'] = stats['wait_seconds'] / stats['checkouts'] if stats['checkouts'] else 0.0
+        return {'size': self.size, 'timeout': self.timeout, 'in_use': in_use, 'idle': idle, **stats}
+
+    def close(self):
+        """Close every idle connection (call at application shutdown)."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+# Async variant for the async endpoints (aiomysql, imported only when the pool is created)
+ASYNC_POOL_SIZE = 32
+ASYNC_POOL_RECYCLE = 3600  # seconds before a pooled async connection is replaced
+
+
+async def create_async_pool(db_config, size=ASYNC_POOL_SIZE, connect_timeout=CONNECT_TIMEOUT,
+                            recycle=ASYNC_POOL_RECYCLE):
+    """aiomysql pool returning dict rows, or None when aiomysql is not installed."""
+    try:
+        import aiomysql
+    except ImportError:
+        print("aiomysql is not installed; async endpoints are disabled (pip install aiomysql).")
+        return None
+    return await aiomysql.create_pool(
+        host=db_config['host'], user=db_config['user'], password=db_config['password'], db=db_config['database'],
+        minsize=0, maxsize=size, autocommit=True, connect_timeout=connect_timeout, pool_recycle=recycle,
+        cursorclass=aiomysql.DictCursor,
+    )
+
+
+async def fetch_all_async(pool, query, params, timeout=POOL_TIMEOUT):
+    """Run a SELECT on a connection from an async pool; raises PoolTimeout when none frees up in time."""
+    try:
+        conn = await asyncio.wait_for(pool.acquire(), timeout)
+    except asyncio.TimeoutError:
+        raise PoolTimeout(f"No async database connection free within {timeout}s (pool size {pool.maxsize})")
+    try:
+        async with conn.cursor() as cursor:
+            await cursor.execute(query, params)
+            return await cursor.fetchall()
+    finally:
+        pool.release(conn)
+
+
+def async_metrics(pool):
+    return {'size': pool.maxsize, 'open': pool.size, 'idle': pool.freesize, 'in_use': pool.size - pool.freesize}
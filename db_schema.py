@@ -0,0 +1,219 @@
+import hashlib
+import math
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+# Typed MySQL schema for the holdings and LLM tables, and the converters that turn
+# CSV / legacy VARCHAR values into those types (unparseable values become NULL).
+
+SENTIMENT_VALUES = ('positive', 'negative', 'neutral')
+# Analysis value written by robinhood.py for models skipped by early-exit voting
+SKIPPED_VOTE = 'skipped'
+# 'error' is written for failed requests
+ANALYSIS_VALUES = SENTIMENT_VALUES + (SKIPPED_VOTE, 'error', 'unknown')
+MAJORITY_VALUES = SENTIMENT_VALUES + ('unknown',)
+
+_DATETIME_FORMATS = ('%m/%d/%Y %I:%M:%S %p', '%m/%d/%Y %I:%M %p', '%m/%d/%Y %H:%M:%S', '%m/%d/%Y %H:%M',
+                     '%m/%d/%Y', '%b-%d-%Y', '%d-%b-%Y', '%Y%m%d')
+
+
+def _is_blank(value):
+    return value is None or (isinstance(value, float) and math.isnan(value)) or str(value).strip() == ''
+
+
+def to_text(value):
+    return None if _is_blank(value) else str(value).strip()
+
+
+def to_decimal(value):
+    """Decimal from values like '1,234.50', '$12.3', '+4.1%', '(7.25)'; None if not a number."""
+    if _is_blank(value):
+        return None
+    text = str(value).strip().replace('$', '').replace(',', '').replace('%', '')
+    negative = text.startswith('(') and text.endswith(')')
+    text = text.strip('()').lstrip('+')
+    try:
+        number = Decimal(text)
+    except InvalidOperation:
+        return None
+    if not number.is_finite():
+        return None
+    return -number if negative else number
+
+
+def to_datetime(value):
+    """Naive local datetime from ISO or common US date strings; None if unparseable."""
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    elif _is_blank(value):
+        return None
+    else:
+        text = str(value).strip()
+        try:
+            parsed = datetime.fromisoformat(text.replace('Z', '+00:00'))
+        except ValueError:
+            for fmt in _DATETIME_FORMATS:
+                try:
+                    parsed = datetime.strptime(text, fmt)
+                    break
+                except ValueError:
+                    continue
+            else:
+                return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def prompt_hash(value):
+    """SHA-256 hex of the stored prompt text (equal to MySQL SHA2(Prompt, 256))."""
+    text = to_text(value)
+    return None if text is None else hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def to_date(value):
+    parsed = to_datetime(value)
+    return parsed.date() if parsed else None
+
+
+def to_label(value, allowed):
+    """Lower-cased label if in allowed, 'error' for error text (when allowed), else 'unknown'."""
+    label = str(value or '').strip().lower()
+    if label in allowed:
+        return label
+    if label.startswith('error') and 'error' in allowed:
+        return 'error'
+    return 'unknown'
+
+
+def to_analysis(value):
+    return to_label(value, ANALYSIS_VALUES)
+
+
+def to_majority(value):
+    return to_label(value, MAJORITY_VALUES)
+
+
+def _enum(values):
+    return "ENUM(" + ', '.join(f"'{v}'" for v in values) + ")"
+
+
+# Per table: (column, MySQL type, converter) in CSV order, columns derived from one of them
+# (column, MySQL type, source column, converter of the raw source value), secondary indexes,
+# whether rows carry a SnapshotTime (load time of the CSV they came from), and a legacy column
+# to take it from when converting old rows.
+SCHEMAS = {
+    'robinhood_holdings': {
+        'columns': [
+            ('Symbol', 'VARCHAR(32)', to_text),
+            ('Quantity', 'DECIMAL(20,6)', to_decimal),
+            ('Price', 'DECIMAL(20,6)', to_decimal),
+            ('Equity', 'DECIMAL(20,4)', to_decimal),
+            ('Percent_Change', 'DECIMAL(12,4)', to_decimal),
+            ('Type', 'VARCHAR(32)', to_text),
+            ('Beta', 'DECIMAL(10,4)', to_decimal),
+            ('Trend', 'VARCHAR(32)', to_text),
+        ],
+        'derived': [],
+        'indexes': ['KEY idx_symbol (Symbol, SnapshotTime)', 'KEY idx_snapshot (SnapshotTime)'],
+        'snapshot': True,
+        'legacy_snapshot': None,
+    },
+    'holdings': {
+        'columns': [
+            ('Ticker', 'VARCHAR(32)', to_text),
+            ('Symbol_Description', 'VARCHAR(128)', to_text),
+            ('Empty1', 'VARCHAR(8)', to_text),
+            ('Quantity', 'DECIMAL(20,6)', to_decimal),
+            ('Price', 'DECIMAL(20,6)', to_decimal),
+            ('Days_Change', 'DECIMAL(20,4)', to_decimal),
+            ('Value', 'DECIMAL(20,4)', to_decimal),
+            ('Days_Value_Change', 'DECIMAL(20,4)', to_decimal),
+            ('Unrealized_Gain_Loss', 'VARCHAR(64)', to_text),
+            ('Last_Updated', 'VARCHAR(32)', to_text),
+            ('Empty2', 'VARCHAR(8)', to_text),
+            ('Beta', 'DECIMAL(10,4)', to_decimal),
+            ('Trend', 'VARCHAR(32)', to_text),
+            ('Exported_On', 'DATETIME', to_datetime),
+        ],
+        'derived': [],
+        'indexes': ['KEY idx_ticker (Ticker, SnapshotTime)', 'KEY idx_snapshot (SnapshotTime)'],
+        'snapshot': True,
+        'legacy_snapshot': 'Exported_On',
+    },
+    'llm_response_record': {
+        'columns': [
+            ('Symbol', 'VARCHAR(32)', to_text),
+            ('Model', 'VARCHAR(64)', to_text),
+            ('RequestTime', 'DATETIME(6)', to_datetime),
+            ('Prompt', 'TEXT', to_text),
+            ('ResponseTime', 'DATETIME(6)', to_datetime),
+            ('Analysis', _enum(ANALYSIS_VALUES), to_analysis),
+            ('Majority', _enum(MAJORITY_VALUES), to_majority),
+            ('ExecTimeSec', 'DECIMAL(10,3)', to_decimal),
+        ],
+        # Concurrent and batched requests for one symbol can start in the same instant, so
+        # the prompt is part of the key; re-loading the same CSV row is still a duplicate
+        'derived': [
+            ('PromptHash', 'CHAR(64)', 'Prompt', prompt_hash),
+            # The model's answer as written, before to_analysis maps non-labels to 'unknown'
+            ('RawAnalysis', 'TEXT', 'Analysis', to_text),
+        ],
+        'indexes': ['UNIQUE KEY unique_record (Symbol, Model, RequestTime, PromptHash)', 'KEY idx_model (Model, RequestTime)',
+                    'KEY idx_majority (Majority, RequestTime)', 'KEY idx_request_time (RequestTime)'],
+        'snapshot': False,
+        'legacy_snapshot': None,
+    },
+}
+
+
+def column_names(kind):
+    """Insertable columns of a typed table, SnapshotTime first when the table has one."""
+    schema = SCHEMAS[kind]
+    return ((['SnapshotTime'] if schema['snapshot'] else []) + [name for name, _, _ in schema['columns']]
+            + [name for name, _, _, _ in schema['derived']])
+
+
+def create_table_sql(table_name, kind, if_not_exists=True):
+    schema = SCHEMAS[kind]
+    definitions = ['id INT AUTO_INCREMENT PRIMARY KEY']
+    if schema['snapshot']:
+        definitions.append('SnapshotTime DATETIME')
+    definitions += [f"{name} {sql_type}" for name, sql_type, _ in schema['columns']]
+    definitions += [f"{name} {sql_type}" for name, sql_type, _, _ in schema['derived']]
+    definitions += schema['indexes']
+    body = ',\n        '.join(definitions)
+    return (f"CREATE TABLE {'IF NOT EXISTS ' if if_not_exists else ''}{table_name} (\n        {body}\n"
+            f"    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4")
+
+
+def typed_values(kind, values, snapshot_time=None):
+    """Tuple for column_names(kind) from raw values in CSV column order (missing values are NULL)."""
+    schema = SCHEMAS[kind]
+    values = list(values) + [None] * (len(schema['columns']) - len(values))
+    typed = [convert(value) for (_, _, convert), value in zip(schema['columns'], values)]
+    names = [name for name, _, _ in schema['columns']]
+    typed += [convert(values[names.index(source)]) for _, _, source, convert in schema['derived']]
+    return tuple(([snapshot_time] if schema['snapshot'] else []) + typed)
+
+
+def is_typed(column_types, kind):
+    """True if {column: DATA_TYPE} from information_schema already matches the typed schema."""
+    schema = SCHEMAS[kind]
+    if schema['snapshot'] and 'snapshottime' not in column_types:
+        return False
+    columns = [(name, sql_type) for name, sql_type, _ in schema['columns']]
+    columns += [(name, sql_type) for name, sql_type, _, _ in schema['derived']]
+    return all(column_types.get(name.lower()) == sql_type.split('(')[0].lower() for name, sql_type in columns)
+
+
+def sql_type_for(series):
+    """Column type for a DataFrame column (Performance table): DATE, DECIMAL or VARCHAR."""
+    values = [value for value in series if not _is_blank(value)]
+    if values and series.name == 'Date' and all(to_date(value) for value in values):
+        return 'DATE', to_date
+    if values and all(to_decimal(value) is not None for value in values):
+        return 'DECIMAL(24,6)', to_decimal
+    return 'VARCHAR(128)', to_text
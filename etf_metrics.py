@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Return and trend metrics for recent-etf-performance-*.csv (leveraged_etf_analysis.py).
+# Every function takes a date-by-ticker Close matrix (NaN where a ticker has no bar)
+# and returns one value per ticker:
+#   trend_sma               price vs 50-day and 200-day SMA (needs 50 bars)
+#   trend_ma_crossover      50-day vs 200-day SMA, +/-2% band (needs 200 bars)
+#   trend_linear_regression slope over the last 30 bars / average price, +/-0.1% band (needs 10 bars)
+#   trend_momentum          last 14 bars vs the 14 before, +/-2% band (needs 30 bars in 90 days)
+
+PERFORMANCE_COLUMNS = [
+    ("1_Week_Performance_%", 7),
+    ("1_Month_Performance_%", 30),
+    ("6_Month_Performance_%", 182),
+    ("YTD_Performance_%", None),
+]
+
+def _window(closes, start):
+    return closes[closes.index >= pd.Timestamp(start).normalize()]
+
+
+def _rank_from_end(window):
+    """1 for the latest valid bar of each ticker, 2 for the one before, ...; 0 where NaN."""
+    valid = window.notna().to_numpy()
+    return np.where(valid, np.flip(np.cumsum(np.flip(valid, axis=0), axis=0), axis=0), 0)
+
+
+def _trailing_mean(window, ranks, first, last):
+    """Mean of each ticker's valid bars ranked first..last from the end (NaN if not enough bars)."""
+    mask = (ranks >= first) & (ranks <= last)
+    values = np.where(mask, window.to_numpy(dtype=float), 0.0)
+    counts = mask.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = values.sum(axis=0) / counts
+    return np.where(counts == last - first + 1, means, np.nan)
+
+
+def _label(values, upper, lower, known):
+    labels = np.where(values > upper, "Uptrend", np.where(values < lower, "Downtrend", "Sideways"))
+    return np.where(known, labels, "Unknown")
+
+
+def period_returns(closes, start):
+    """Percent change from first to last valid Close at or after start (NaN with fewer than 2 bars)."""
+    window = _window(closes, start)
+    first = window.bfill().iloc[0] if not window.empty else pd.Series(np.nan, index=closes.columns)
+    last = window.ffill().iloc[-1] if not window.empty else pd.Series(np.nan, index=closes.columns)
+    returns = (last - first) / first * 100
+    return returns.where(window.notna().sum() >= 2)
+
+
+def trend_sma(closes, now):
+    window = _window(closes, now - timedelta(days=250))
+    ranks = _rank_from_end(window)
+    counts = ranks.max(axis=0) if len(window) else np.zeros(closes.shape[1], dtype=int)
+    current = _trailing_mean(window, ranks, 1, 1)
+    sma_50 = _trailing_mean(window, ranks, 1, 50)
+    sma_200 = _trailing_mean(window, ranks, 1, 200)
+    above_50 = current > sma_50
+    above_200 = current > sma_200
+    with_200 = np.where(above_50 & above_200, "Uptrend",
+                        np.where(~above_50 & ~above_200, "Downtrend", "Sideways"))
+    only_50 = np.where(above_50, "Uptrend", "Downtrend")
+    labels = np.where(counts >= 200, with_200, only_50)
+    return pd.Series(np.where(counts >= 50, labels, "Unknown"), index=closes.columns)
+
+
+def trend_ma_crossover(closes, now):
+    window = _window(closes, now - timedelta(days=250))
+    ranks = _rank_from_end(window)
+    sma_50 = _trailing_mean(window, ranks, 1, 50)
+    sma_200 = _trailing_mean(window, ranks, 1, 200)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        diff_pct = (sma_50 - sma_200) / sma_200 * 100
+    return pd.Series(_label(diff_pct, 2, -2, ~np.isnan(diff_pct)), index=closes.columns)
+
+
+def trend_linear_regression(closes, now, days=30):
+    """
+    Closed-form least-squares slope over each ticker's last `days` valid bars,
+    normalized by average price (the slope np.polyfit(x, y, 1) gives, for all tickers at once).
+    """
+    window = _window(closes, now - timedelta(days=days + 10))
+    ranks = _rank_from_end(window)
+    counts = ranks.max(axis=0) if len(window) else np.zeros(closes.shape[1], dtype=int)
+    n = np.minimum(counts, days).astype(float)
+    mask = (ranks >= 1) & (ranks <= n)
+    y = np.where(mask, window.to_numpy(dtype=float), 0.0)
+    x = np.where(mask, n - ranks, 0.0)
+    sum_x = n * (n - 1) / 2
+    sum_xx = (n - 1) * n * (2 * n - 1) / 6
+    sum_y = y.sum(axis=0)
+    sum_xy = (x * y).sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = (n * sum_xy - sum_x * sum_y) / (n * sum_xx - sum_x ** 2)
+        normalized = slope / (sum_y / n) * 100
+    return pd.Series(_label(normalized, 0.1, -0.1, counts >= 10), index=closes.columns)
+
+
+def trend_momentum(closes, now):
+    window = _window(closes, now - timedelta(days=90))
+    ranks = _rank_from_end(window)
+    counts = ranks.max(axis=0) if len(window) else np.zeros(closes.shape[1], dtype=int)
+    recent_14d = _trailing_mean(window, ranks, 1, 14)
+    prev_14d = _trailing_mean(window, ranks, 15, 28)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        change_pct = (recent_14d - prev_14d) / prev_14d * 100
+    return pd.Series(_label(change_pct, 2, -2, counts >= 30), index=closes.columns)
+
+
+def compute_etf_metrics(closes, now=None):
+    """
+    Compute every return and trend column written to recent-etf-performance-*.csv
+    for all tickers in the Close matrix at once. Returns a DataFrame indexed by ticker.
+    """
+    if now is None:
+        now = datetime.now()
+    closes = closes.set_axis(pd.DatetimeIndex(closes.index), axis=0).sort_index()
+    metrics = pd.DataFrame(index=closes.columns)
+    for column, days in PERFORMANCE_COLUMNS:
+        start = datetime(now.year, 1, 1) if days is None else now - timedelta(days=days)
+        metrics[column] = period_returns(closes, start)
+    metrics["Trend_SMA"] = trend_sma(closes, now)
+    metrics["Trend_MA_Crossover"] = trend_ma_crossover(closes, now)
+    metrics["Trend_Linear_Regression"] = trend_linear_regression(closes, now)
+    metrics["Trend_Momentum"] = trend_momentum(closes, now)
+    return metrics
@@ -1,16 +1,35 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import HTMLResponse, Response
 import pandas as pd
 import numpy as np
 import os
 import glob
-from datetime import datetime
+import gzip
+import hashlib
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
 import json
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import plotly.express as px
 
-app = FastAPI(title="ETF Performance Service", version="1.0.0")
+try:
+    import brotli  # optional: br responses when installed, gzip otherwise
+except ImportError:
+    brotli = None
+
+@asynccontextmanager
+async def lifespan(app):
+    # Pre-render the dashboards and keep them current as new data files land
+    _WATCHER_STOP.clear()
+    threading.Thread(target=watch_dashboards, name="dashboard-watcher", daemon=True).start()
+    yield
+    _WATCHER_STOP.set()
+
+app = FastAPI(title="ETF Performance Service", version="1.0.0", lifespan=lifespan)
 
 OUTPUT_DIR = os.path.join(os.path.dirname(__file__), 'output')
 
@@ -38,34 +57,122 @@ def get_latest_india_etf_performance_file():
     latest_file = max(files, key=os.path.getmtime)
     return latest_file
 
-def load_etf_data():
-    """Load the latest ETF performance data"""
-    latest_file = get_latest_etf_performance_file()
-    
+# Parsed ETF CSVs are cached per dataset, keyed by (path, mtime, size) of the latest file.
+# For CACHE_CHECK_INTERVAL seconds after a check, requests are served from memory without
+# touching disk; after that the output directory is re-globbed and a new or rewritten file
+# replaces the entry.
+CACHE_CHECK_INTERVAL = 5.0
+ETF_DATASETS = {
+    'us': (get_latest_etf_performance_file, "recent-etf-performance-", "No ETF performance data found"),
+    'india': (get_latest_india_etf_performance_file, "india_etf_performance_", "No India ETF performance data found"),
+}
+CACHE_STATS = {'hits': 0, 'checks': 0, 'loads': 0}
+_DATA_CACHE = {}
+_CACHE_LOCK = threading.Lock()
+# Datasets being checked or reloaded right now; other requests get the cached entry meanwhile
+_LOADING = set()
+
+
+class EtfData:
+    """One parsed ETF performance file with per-group slices and sorted views built once."""
+
+    def __init__(self, key, df, file_date):
+        self.key = key
+        self.df = df
+        self.file_date = file_date
+        self.checked_at = time.monotonic()
+        self.groups = df['Group'].unique().tolist()
+        self.by_group = {group: df[df['Group'] == group] for group in self.groups}
+        self.group_names = {str(group).lower(): group for group in self.groups}
+        # Each group ascending by 1-week performance (dashboard bar order)
+        self.group_by_week = {group: rows.sort_values('1_Week_Performance_%', ascending=True)
+                              for group, rows in self.by_group.items()}
+        # Whole file best-first by 1-week performance (same order as nlargest)
+        self.top_by_week = df.dropna(subset=['1_Week_Performance_%']).sort_values(
+            '1_Week_Performance_%', ascending=False, kind='mergesort')
+        self._records = {}
+
+    def records(self, group=None):
+        """to_dict(orient='records') of the file or of one group, computed once."""
+        if group not in self._records:
+            rows = self.df if group is None else self.by_group[group]
+            self._records[group] = rows.to_dict(orient='records')
+        return self._records[group]
+
+    def top(self, n):
+        return self.top_by_week.head(n)
+
+
+def _file_key(path):
+    stat = os.stat(path)
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+
+def get_etf_data(dataset='us'):
+    """
+    Cached EtfData for the latest file of a dataset ('us' or 'india'); 404 if none, 500 if unreadable.
+    The file is checked and read outside _CACHE_LOCK by one request at a time, while the others keep
+    getting the cached entry; the new data replaces it only if the file's (path, mtime, size) did not
+    change while it was read.
+    """
+    find_latest, prefix, missing = ETF_DATASETS[dataset]
+    with _CACHE_LOCK:
+        cached = _DATA_CACHE.get(dataset)
+        if cached is not None and (dataset in _LOADING or
+                                   time.monotonic() - cached.checked_at < CACHE_CHECK_INTERVAL):
+            CACHE_STATS['hits'] += 1
+            return cached
+        CACHE_STATS['checks'] += 1
+        _LOADING.add(dataset)
+    try:
+        return _reload_etf_data(dataset, cached, find_latest, prefix, missing)
+    finally:
+        with _CACHE_LOCK:
+            _LOADING.discard(dataset)
+
+
+def _reload_etf_data(dataset, cached, find_latest, prefix, missing):
+    latest_file = find_latest()
     if not latest_file:
-        raise HTTPException(status_code=404, detail="No ETF performance data found")
-    
+        with _CACHE_LOCK:
+            _DATA_CACHE.pop(dataset, None)
+        raise HTTPException(status_code=404, detail=missing)
     try:
+        key = _file_key(latest_file)
+        if cached is not None and cached.key == key:
+            cached.checked_at = time.monotonic()
+            return cached
         df = pd.read_csv(latest_file)
-        file_date = os.path.basename(latest_file).replace("recent-etf-performance-", "").replace(".csv", "")
-        return df, file_date
+        file_date = os.path.basename(latest_file).replace(prefix, "").replace(".csv", "")
+        data = EtfData(key, df, file_date)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error reading data: {str(e)}")
+    try:
+        unchanged = _file_key(latest_file) == key
+    except OSError:
+        unchanged = False
+    with _CACHE_LOCK:
+        current = _DATA_CACHE.get(dataset)
+        if current is not None and current.key == key:
+            # Another request loaded the same file first
+            return current
+        if unchanged:
+            # A file rewritten while it was read is served once but not cached
+            CACHE_STATS['loads'] += 1
+            _DATA_CACHE[dataset] = data
+    return data
 
 
-def load_india_etf_data():
-    """Load the latest India ETF performance data"""
-    latest_file = get_latest_india_etf_performance_file()
+def load_etf_data():
+    """Load the latest ETF performance data"""
+    data = get_etf_data('us')
+    return data.df, data.file_date
 
-    if not latest_file:
-        raise HTTPException(status_code=404, detail="No India ETF performance data found")
 
-    try:
-        df = pd.read_csv(latest_file)
-        file_date = os.path.basename(latest_file).replace("india_etf_performance_", "").replace(".csv", "")
-        return df, file_date
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error reading data: {str(e)}")
+def load_india_etf_data():
+    """Load the latest India ETF performance data"""
+    data = get_etf_data('india')
+    return data.df, data.file_date
 
 @app.get("/")
 def root():
@@ -87,42 +194,44 @@ def health_check():
     return {
         "status": "healthy",
         "latest_file": os.path.basename(latest_file) if latest_file else None,
+        "cache": dict(CACHE_STATS),
+        "dashboards": dict(PAGE_STATS),
         "timestamp": datetime.now().isoformat()
     }
 
 @app.get("/api/etf-performance")
 def get_etf_performance():
     """Get all ETF performance data in JSON format"""
-    df, file_date = load_etf_data()
+    etf_data = get_etf_data('us')
     
     # Convert DataFrame to JSON-friendly format
-    data = df.to_dict(orient='records')
+    data = etf_data.records()
     
     return {
-        "data_date": file_date,
+        "data_date": etf_data.file_date,
         "total_etfs": len(data),
-        "groups": df['Group'].unique().tolist(),
+        "groups": etf_data.groups,
         "etfs": data
     }
 
 @app.get("/api/etf-performance/group/{group}")
 def get_etf_performance_by_group(group: str):
     """Get ETF performance data for a specific group"""
-    df, file_date = load_etf_data()
+    etf_data = get_etf_data('us')
     
     # Filter by group (case-insensitive)
-    group_data = df[df['Group'].str.lower() == group.lower()]
+    group_name = etf_data.group_names.get(group.lower())
     
-    if group_data.empty:
+    if group_name is None:
         raise HTTPException(
             status_code=404, 
-            detail=f"Group '{group}' not found. Available groups: {df['Group'].unique().tolist()}"
+            detail=f"Group '{group}' not found. Available groups: {etf_data.groups}"
         )
     
-    data = group_data.to_dict(orient='records')
+    data = etf_data.records(group_name)
     
     return {
-        "data_date": file_date,
+        "data_date": etf_data.file_date,
         "group": group,
         "total_etfs": len(data),
         "etfs": data
@@ -131,25 +240,21 @@ def get_etf_performance_by_group(group: str):
 @app.get("/api/etf-performance/top/{n}")
 def get_top_performers(n: int = 10):
     """Get top N performers by 1-week performance"""
-    df, file_date = load_etf_data()
+    etf_data = get_etf_data('us')
     
-    # Sort by 1-week performance and get top N
-    top_etfs = df.nlargest(n, '1_Week_Performance_%')
+    # Top N of the pre-sorted 1-week performance view
+    top_etfs = etf_data.top(n)
     data = top_etfs.to_dict(orient='records')
     
     return {
-        "data_date": file_date,
+        "data_date": etf_data.file_date,
         "top_n": n,
         "etfs": data
     }
 
-@app.get("/dashboard", response_class=HTMLResponse)
-def dashboard():
+def render_dashboard(etf_data):
     """Interactive HTML dashboard with graphs by group"""
-    try:
-        df, file_date = load_etf_data()
-    except HTTPException as e:
-        return f"<html><body><h1>Error: {e.detail}</h1></body></html>"
+    df, file_date = etf_data.df, etf_data.file_date
     
     # Parse date for display
     try:
@@ -159,16 +264,14 @@ def dashboard():
         display_date = file_date
     
     # Get unique groups
-    groups = df['Group'].unique()
+    groups = etf_data.groups
     
     # Create individual graphs for each group
     graphs_html = []
     
     for group in groups:
-        group_data = df[df['Group'] == group].copy()
-        
-        # Sort by 1-week performance
-        group_data = group_data.sort_values('1_Week_Performance_%', ascending=True)
+        # Already sorted by 1-week performance
+        group_data = etf_data.group_by_week[group].copy()
         
         # Take top 15 and bottom 10 if more than 25 ETFs
         if len(group_data) > 25:
@@ -354,7 +457,7 @@ def dashboard():
     avg_ytd = df['YTD_Performance_%'].mean()
     
     # Top 5 performers
-    top_5 = df.nlargest(5, '1_Week_Performance_%')[['ETF_Ticker', 'ETF_Name', 'Group', 'AUM', '1_Week_Performance_%', '1_Month_Performance_%']]
+    top_5 = etf_data.top(5)[['ETF_Ticker', 'ETF_Name', 'Group', 'AUM', '1_Week_Performance_%', '1_Month_Performance_%']]
     
     # Create top performers table HTML
     top_performers_html = top_5.to_html(index=False, classes='table table-striped', border=0)
@@ -474,13 +577,9 @@ def dashboard():
     return html_content
 
 
-@app.get("/indiadashboard", response_class=HTMLResponse)
-def india_dashboard():
+def render_india_dashboard(etf_data):
     """Interactive HTML dashboard for India ETF data"""
-    try:
-        df, file_date = load_india_etf_data()
-    except HTTPException as e:
-        return f"<html><body><h1>Error: {e.detail}</h1></body></html>"
+    df, file_date = etf_data.df, etf_data.file_date
 
     # Parse date for display
     try:
@@ -490,16 +589,14 @@ def india_dashboard():
         display_date = file_date
 
     # Get unique groups
-    groups = df['Group'].unique()
+    groups = etf_data.groups
 
     # Create individual graphs for each group
     graphs_html = []
 
     for group in groups:
-        group_data = df[df['Group'] == group].copy()
-
-        # Sort by 1-week performance
-        group_data = group_data.sort_values('1_Week_Performance_%', ascending=True)
+        # Already sorted by 1-week performance
+        group_data = etf_data.group_by_week[group].copy()
 
         # Take top 15 and bottom 10 if more than 25 ETFs
         if len(group_data) > 25:
@@ -638,7 +735,7 @@ def india_dashboard():
     avg_ytd = df['YTD_Performance_%'].mean()
 
     # Top 5 performers
-    top_5 = df.nlargest(5, '1_Week_Performance_%')[['ETF_Ticker', 'ETF_Name', 'Group', '1_Week_Performance_%', '1_Month_Performance_%']]
+    top_5 = etf_data.top(5)[['ETF_Ticker', 'ETF_Name', 'Group', '1_Week_Performance_%', '1_Month_Performance_%']]
 
     # Create top performers table HTML
     top_performers_html = top_5.to_html(index=False, classes='table table-striped', border=0)
@@ -757,6 +854,146 @@ def india_dashboard():
 
     return html_content
 
+
+# Dashboards are rendered once per data file instead of once per request. A background
+# thread (started with the app) renders each dataset at startup and again whenever its
+# latest CSV changes; requests are served the cached HTML, pre-compressed, with an ETag and
+# Last-Modified (the CSV's mtime) so unchanged pages are answered with 304 Not Modified.
+# A request that sees newer data before the watcher does keeps getting the previous page
+# while the new one renders.
+DASHBOARD_RENDERERS = {'us': render_dashboard, 'india': render_india_dashboard}
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+PAGE_STATS = {'renders': 0, 'last_render_seconds': 0.0, 'served': 0, 'not_modified': 0}
+_PAGES = {}
+_RENDER_LOCKS = {dataset: threading.Lock() for dataset in DASHBOARD_RENDERERS}
+_WATCHER_STOP = threading.Event()
+
+
+class DashboardPage:
+    """Rendered dashboard HTML for one data file, in every encoding it is served in."""
+
+    def __init__(self, key, html):
+        self.key = key
+        body = html.encode('utf-8')
+        self.bodies = {'identity': body, 'gzip': gzip.compress(body, GZIP_LEVEL)}
+        if brotli is not None:
+            self.bodies['br'] = brotli.compress(body, quality=BROTLI_QUALITY)
+        self.etag = f'W/"{hashlib.sha1(body).hexdigest()[:20]}"'
+        self.modified = int(key[1] // 1_000_000_000)  # CSV mtime, whole seconds
+        self.last_modified = formatdate(self.modified, usegmt=True)
+
+
+def render_page(dataset, etf_data):
+    """Render and cache the dashboard for etf_data (no-op if that file is already rendered)."""
+    with _RENDER_LOCKS[dataset]:
+        page = _PAGES.get(dataset)
+        if page is not None and page.key == etf_data.key:
+            return page
+        start = time.perf_counter()
+        page = DashboardPage(etf_data.key, DASHBOARD_RENDERERS[dataset](etf_data))
+        elapsed = time.perf_counter() - start
+        PAGE_STATS['renders'] += 1
+        PAGE_STATS['last_render_seconds'] = round(elapsed, 3)
+        _PAGES[dataset] = page
+        print(f"Rendered {dataset} dashboard for {etf_data.file_date} in {elapsed:.2f}s")
+        return page
+
+
+def _render_in_background(dataset, etf_data):
+    try:
+        render_page(dataset, etf_data)
+    except Exception as e:
+        print(f"Error rendering {dataset} dashboard: {e}")
+
+
+def get_dashboard_page(dataset):
+    """Cached page for the latest data; the first request renders it, later changes render in the background."""
+    etf_data = get_etf_data(dataset)
+    page = _PAGES.get(dataset)
+    if page is None:
+        return render_page(dataset, etf_data)
+    if page.key != etf_data.key and not _RENDER_LOCKS[dataset].locked():
+        threading.Thread(target=_render_in_background, args=(dataset, etf_data), daemon=True).start()
+    return page
+
+
+def watch_dashboards():
+    """Re-render a dashboard whenever its dataset's latest file changes (runs until shutdown)."""
+    while not _WATCHER_STOP.is_set():
+        for dataset in DASHBOARD_RENDERERS:
+            try:
+                _render_in_background(dataset, get_etf_data(dataset))
+            except HTTPException:
+                pass  # no data file (yet)
+        _WATCHER_STOP.wait(CACHE_CHECK_INTERVAL)
+
+
+def _accepted_encodings(header):
+    """Content codings from an Accept-Encoding header, ignoring those with q=0 or a malformed q."""
+    accepted = set()
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        params = params.replace(' ', '')
+        quality = 1.0
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        if coding and 0 < quality <= 1:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _not_modified(request, page):
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        # Weak comparison (RFC 9110): the W/ prefix is ignored
+        tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+        return '*' in tags or page.etag.removeprefix('W/') in tags
+    if_modified_since = request.headers.get('if-modified-since')
+    if not if_modified_since:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError, IndexError):
+        return False  # unparseable date: ignore the header
+    if since.tzinfo is None:
+        # HTTP dates are GMT; "-0000" and zone-less dates parse as naive datetimes
+        since = since.replace(tzinfo=timezone.utc)
+    return since.timestamp() >= page.modified
+
+
+def dashboard_response(request, dataset):
+    try:
+        page = get_dashboard_page(dataset)
+    except HTTPException as e:
+        return HTMLResponse(f"<html><body><h1>Error: {e.detail}</h1></body></html>")
+    headers = {'ETag': page.etag, 'Last-Modified': page.last_modified,
+               'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+    if _not_modified(request, page):
+        PAGE_STATS['not_modified'] += 1
+        return Response(status_code=304, headers=headers)
+    accepted = _accepted_encodings(request.headers.get('accept-encoding', ''))
+    encoding = next((coding for coding in ('br', 'gzip') if coding in accepted and coding in page.bodies), 'identity')
+    if encoding != 'identity':
+        headers['Content-Encoding'] = encoding
+    PAGE_STATS['served'] += 1
+    return HTMLResponse(page.bodies[encoding], headers=headers)
+
+
+@app.get("/dashboard", response_class=HTMLResponse)
+def dashboard(request: Request):
+    """Interactive HTML dashboard with graphs by group"""
+    return dashboard_response(request, 'us')
+
+
+@app.get("/indiadashboard", response_class=HTMLResponse)
+def india_dashboard(request: Request):
+    """Interactive HTML dashboard for India ETF data"""
+    return dashboard_response(request, 'india')
+
 if __name__ == "__main__":
     import uvicorn
     print("Starting ETF Performance Service...")
@@ -1,38 +1,20 @@
-# GET endpoint for llm_response_record table
-@app.get("/llm_responses/")
-def get_llm_responses(
-    model: Optional[str] = Query(None, description="Filter by model name"),
-    majority: Optional[str] = Query(None, description="Filter by majority sentiment (positive/negative/neutral)"),
-    limit: int = Query(100, description="Max number of records to return")
-):
-    db_config = load_db_config()
-    conn = mysql.connector.connect(**db_config)
-    cursor = conn.cursor(dictionary=True)
-    query = "SELECT * FROM llm_response_record"
-    params = []
-    filters = []
-    if model:
-        filters.append("Model = %s")
-        params.append(model)
-    if majority:
-        filters.append("Majority = %s")
-        params.append(majority)
-    if filters:
-        query += " WHERE " + " AND ".join(filters)
-    query += " LIMIT %s"
-    params.append(limit)
-    cursor.execute(query, params)
-    results = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return {"data": results}
-from fastapi import FastAPI, Query
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from decimal import Decimal
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import Optional
-import mysql.connector
 import json
 from cryptography.fernet import Fernet
 
-app = FastAPI()
+import db_pool
+import db_schema
+
+# /llm_responses/: columns a client may select with ?fields=, default page size, and
+# rows fetched per keyset page when streaming NDJSON
+LLM_RESPONSE_COLUMNS = ['id'] + db_schema.column_names('llm_response_record')
+DEFAULT_LIMIT = 100
+STREAM_PAGE_SIZE = 1000
 
 def load_db_config(config_path='config.json'):
     with open(config_path, 'r') as f:
@@ -48,14 +30,42 @@ def load_db_config(config_path='config.json'):
     }
     return db_config
 
-@app.get("/holdings/")
-def get_holdings(
-    ticker: Optional[str] = Query(None, description="Filter by ticker symbol"),
-    limit: int = Query(100, description="Max number of records to return")
-):
+@asynccontextmanager
+async def lifespan(app):
+    # Config is read and decrypted once; every request borrows a connection from a pool
     db_config = load_db_config()
-    conn = mysql.connector.connect(**db_config)
-    cursor = conn.cursor(dictionary=True)
+    app.state.db_pool = db_pool.DBPool(db_config)
+    app.state.async_pool = await db_pool.create_async_pool(db_config)
+    yield
+    app.state.db_pool.close()
+    if app.state.async_pool is not None:
+        app.state.async_pool.close()
+        await app.state.async_pool.wait_closed()
+
+app = FastAPI(lifespan=lifespan)
+
+@app.exception_handler(db_pool.PoolTimeout)
+def pool_timeout_handler(request: Request, exc: db_pool.PoolTimeout):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+def run_query(query, params):
+    """Run a SELECT on a pooled connection and return the rows as dicts."""
+    with app.state.db_pool.connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+async def run_query_async(query, params):
+    """Async counterpart of run_query on the aiomysql pool (503 if aiomysql is not installed)."""
+    pool = app.state.async_pool
+    if pool is None:
+        raise HTTPException(status_code=503, detail="Async database access needs aiomysql")
+    return await db_pool.fetch_all_async(pool, query, params)
+
+def holdings_query(ticker, limit):
     query = "SELECT * FROM holdings"
     params = []
     if ticker:
@@ -63,20 +73,9 @@ def get_holdings(
         params.append(ticker)
     query += " LIMIT %s"
     params.append(limit)
-    cursor.execute(query, params)
-    results = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return {"data": results}
+    return query, params
 
-@app.get("/robinhood_holdings/")
-def get_robinhood_holdings(
-    symbol: Optional[str] = Query(None, description="Filter by symbol"),
-    limit: int = Query(100, description="Max number of records to return")
-):
-    db_config = load_db_config()
-    conn = mysql.connector.connect(**db_config)
-    cursor = conn.cursor(dictionary=True)
+def robinhood_holdings_query(symbol, limit):
     query = "SELECT * FROM robinhood_holdings"
     params = []
     if symbol:
@@ -84,10 +83,164 @@ def get_robinhood_holdings(
         params.append(symbol)
     query += " LIMIT %s"
     params.append(limit)
-    cursor.execute(query, params)
-    results = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return {"data": results}
+    return query, params
+
+def llm_response_columns(fields):
+    """Columns for ?fields=a,b (id is always included for paging); 400 on unknown names."""
+    if not fields:
+        return LLM_RESPONSE_COLUMNS
+    requested = [name.strip() for name in fields.split(',') if name.strip()]
+    unknown = [name for name in requested if name not in LLM_RESPONSE_COLUMNS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields {unknown}; choose from {LLM_RESPONSE_COLUMNS}")
+    return ['id'] + [name for name in requested if name != 'id']
+
+def llm_responses_query(limit, after_id=None, model=None, majority=None, start=None, end=None, fields=None):
+    """Keyset page: rows with id > after_id in id order, RequestTime in [start, end)."""
+    query = f"SELECT {', '.join(llm_response_columns(fields))} FROM llm_response_record"
+    params = []
+    filters = []
+    if after_id is not None:
+        filters.append("id > %s")
+        params.append(after_id)
+    if model:
+        filters.append("Model = %s")
+        params.append(model)
+    if majority:
+        filters.append("Majority = %s")
+        params.append(majority)
+    if start:
+        filters.append("RequestTime >= %s")
+        params.append(start)
+    if end:
+        filters.append("RequestTime < %s")
+        params.append(end)
+    if filters:
+        query += " WHERE " + " AND ".join(filters)
+    query += " ORDER BY id LIMIT %s"
+    params.append(limit)
+    return query, params
+
+def llm_responses_page(rows, limit):
+    # A full page may have more rows after it; clients pass next_after_id back as after_id
+    return {"data": rows, "next_after_id": rows[-1]["id"] if rows and len(rows) == limit else None}
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+def ndjson_lines(rows):
+    return "".join(json.dumps(row, default=_json_default) + "\n" for row in rows)
+
+def _stream_pages(limit):
+    """Page sizes for streaming up to limit rows (None = all)."""
+    remaining = limit
+    while remaining is None or remaining > 0:
+        page = STREAM_PAGE_SIZE if remaining is None else min(STREAM_PAGE_SIZE, remaining)
+        yield page
+        if remaining is not None:
+            remaining -= page
+
+def stream_llm_responses(limit, after_id, filters):
+    """NDJSON chunks, one keyset page at a time; a connection is held only while a page is read."""
+    for page in _stream_pages(limit):
+        rows = run_query(*llm_responses_query(page, after_id, **filters))
+        if rows:
+            yield ndjson_lines(rows)
+        if len(rows) < page:
+            return
+        after_id = rows[-1]["id"]
+
+async def stream_llm_responses_async(limit, after_id, filters):
+    for page in _stream_pages(limit):
+        rows = await run_query_async(*llm_responses_query(page, after_id, **filters))
+        if rows:
+            yield ndjson_lines(rows)
+        if len(rows) < page:
+            return
+        after_id = rows[-1]["id"]
+
+@app.get("/health")
+def health_check():
+    """Database health check (SELECT 1 through the pool); 503 when the database is unreachable"""
+    health = app.state.db_pool.health()
+    health["timestamp"] = datetime.now().isoformat()
+    return JSONResponse(status_code=200 if health["status"] == "healthy" else 503, content=health)
+
+@app.get("/metrics")
+def metrics():
+    """Connection pool stats: size, in use, idle, checkouts, waits, timeouts, connects"""
+    pool = app.state.async_pool
+    return {"db_pool": app.state.db_pool.metrics(),
+            "async_pool": db_pool.async_metrics(pool) if pool is not None else None}
+
+# Sync endpoints run in FastAPI's threadpool; the /async/ variants below run on the event loop
+@app.get("/holdings/")
+def get_holdings(
+    ticker: Optional[str] = Query(None, description="Filter by ticker symbol"),
+    limit: int = Query(100, description="Max number of records to return")
+):
+    return {"data": run_query(*holdings_query(ticker, limit))}
+
+@app.get("/robinhood_holdings/")
+def get_robinhood_holdings(
+    symbol: Optional[str] = Query(None, description="Filter by symbol"),
+    limit: int = Query(100, description="Max number of records to return")
+):
+    return {"data": run_query(*robinhood_holdings_query(symbol, limit))}
+
+# GET endpoint for llm_response_record table
+@app.get("/llm_responses/")
+def get_llm_responses(
+    model: Optional[str] = Query(None, description="Filter by model name"),
+    majority: Optional[str] = Query(None, description="Filter by majority sentiment (positive/negative/neutral)"),
+    start: Optional[datetime] = Query(None, description="RequestTime on or after this time"),
+    end: Optional[datetime] = Query(None, description="RequestTime before this time"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return (id always included)"),
+    after_id: Optional[int] = Query(None, description="Return rows after this id (next_after_id of the previous page)"),
+    limit: Optional[int] = Query(None, description="Max number of records to return (default 100; all for ndjson)"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="json page, or ndjson stream")
+):
+    filters = dict(model=model, majority=majority, start=start, end=end, fields=fields)
+    llm_response_columns(fields)  # reject unknown fields before a stream starts
+    if format == "ndjson":
+        return StreamingResponse(stream_llm_responses(limit, after_id, filters), media_type="application/x-ndjson")
+    limit = limit or DEFAULT_LIMIT
+    return llm_responses_page(run_query(*llm_responses_query(limit, after_id, **filters)), limit)
+
+@app.get("/async/holdings/")
+async def get_holdings_async(
+    ticker: Optional[str] = Query(None, description="Filter by ticker symbol"),
+    limit: int = Query(100, description="Max number of records to return")
+):
+    return {"data": await run_query_async(*holdings_query(ticker, limit))}
+
+@app.get("/async/robinhood_holdings/")
+async def get_robinhood_holdings_async(
+    symbol: Optional[str] = Query(None, description="Filter by symbol"),
+    limit: int = Query(100, description="Max number of records to return")
+):
+    return {"data": await run_query_async(*robinhood_holdings_query(symbol, limit))}
+
+@app.get("/async/llm_responses/")
+async def get_llm_responses_async(
+    model: Optional[str] = Query(None, description="Filter by model name"),
+    majority: Optional[str] = Query(None, description="Filter by majority sentiment (positive/negative/neutral)"),
+    start: Optional[datetime] = Query(None, description="RequestTime on or after this time"),
+    end: Optional[datetime] = Query(None, description="RequestTime before this time"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return (id always included)"),
+    after_id: Optional[int] = Query(None, description="Return rows after this id (next_after_id of the previous page)"),
+    limit: Optional[int] = Query(None, description="Max number of records to return (default 100; all for ndjson)"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="json page, or ndjson stream")
+):
+    filters = dict(model=model, majority=majority, start=start, end=end, fields=fields)
+    llm_response_columns(fields)  # reject unknown fields before a stream starts
+    if format == "ndjson":
+        return StreamingResponse(stream_llm_responses_async(limit, after_id, filters), media_type="application/x-ndjson")
+    limit = limit or DEFAULT_LIMIT
+    return llm_responses_page(await run_query_async(*llm_responses_query(limit, after_id, **filters)), limit)
 
 # To run: uvicorn fastapi_service:app --reload
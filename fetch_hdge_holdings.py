@@ -5,6 +5,7 @@ import glob
 import os
 from datetime import datetime, timedelta
 import yfinance as yf
+import price_history
 
 OUTPUT_DIR = os.path.join(os.path.dirname(__file__), 'output')
 os.makedirs(OUTPUT_DIR, exist_ok=True)
@@ -73,8 +74,7 @@ def check_price_increases(tickers):
     
     for ticker in tickers:
         try:
-            stock = yf.Ticker(ticker)
-            hist = stock.history(start=one_year_ago, end=now)
+            hist = price_history.get_history(ticker, one_year_ago, now)
             
             if hist.empty or len(hist) < 2:
                 continue
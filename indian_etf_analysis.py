@@ -5,7 +5,10 @@ from datetime import datetime, timedelta
 
 import numpy as np
 import pandas as pd
-import yfinance as yf
+
+import price_history
+import task_pool
+import ticker_info
 
 # Indian ETFs (NSE listings, use .NS suffix). Grouped for clarity.
 INDIA_ETFS = {
@@ -253,7 +256,7 @@ INDEX_PATTERNS = [
 
 def _history_from_yfinance(ticker, start, end):
     try:
-        data = yf.Ticker(ticker).history(start=start, end=end)
+        data = price_history.get_history(ticker, start, end)
         return data if not data.empty else None
     except Exception as exc:
         message = str(exc)
@@ -370,9 +373,8 @@ def get_etf_info(ticker):
     cached = INFO_CACHE.get(ticker)
     if cached is not None:
         return cached
-    info = {}
     try:
-        info = yf.Ticker(ticker).info or {}
+        info = ticker_info.get_info(ticker, ["longName", "shortName", "totalAssets"])
     except Exception:
         info = {}
     name = info.get("longName") or info.get("shortName") or ticker
@@ -436,42 +438,56 @@ def calculate_trend_sma(ticker):
         return "Unknown"
 
 
-def analyze_indian_etfs():
+def analyze_ticker(ticker, group, now):
+    if not has_recent_history(ticker):
+        return None
+    print(f"  Analyzing {ticker}...")
+    week_perf = get_return(ticker, now - timedelta(days=7), now)
+    month_perf = get_return(ticker, now - timedelta(days=30), now)
+    six_month_perf = get_return(ticker, now - timedelta(days=182), now)
+    ytd_perf = get_ytd_return(ticker)
+    etf_name = get_etf_name(ticker)
+    trend_sma = calculate_trend_sma(ticker)
+    risk = get_annualized_std(ticker)
+
+    return {
+        "ETF_Ticker": ticker,
+        "ETF_Name": etf_name,
+        "Group": group,
+        "1_Week_Performance_%": round_value(week_perf),
+        "1_Month_Performance_%": round_value(month_perf),
+        "6_Month_Performance_%": round_value(six_month_perf),
+        "YTD_Performance_%": round_value(ytd_perf),
+        "Risk_StdDev_%": round_value(risk),
+        "Trend_SMA": trend_sma,
+    }
+
+
+def analyze_indian_etfs(max_workers=task_pool.DEFAULT_MAX_WORKERS):
     now = datetime.now()
     date_str = now.strftime("%d%m%Y")
 
-    all_results = []
     exclusions = load_exclusions()
 
+    # Warm INFO_CACHE concurrently so primary-ticker selection needs no further requests
+    all_tickers = [ticker for tickers in INDIA_ETFS.values() for ticker in tickers]
+    print(f"Fetching ETF info for {len(all_tickers)} tickers...")
+    task_pool.run_in_pool(get_etf_info, all_tickers, max_workers=max_workers)
+
+    jobs = []
     for group, tickers in INDIA_ETFS.items():
-        print(f"Analyzing {group} ETFs...")
         for ticker in select_primary_tickers(tickers):
-            if ticker in exclusions:
-                continue
-            if not has_recent_history(ticker):
-                continue
-            print(f"  Analyzing {ticker}...")
-            week_perf = get_return(ticker, now - timedelta(days=7), now)
-            month_perf = get_return(ticker, now - timedelta(days=30), now)
-            six_month_perf = get_return(ticker, now - timedelta(days=182), now)
-            ytd_perf = get_ytd_return(ticker)
-            etf_name = get_etf_name(ticker)
-            trend_sma = calculate_trend_sma(ticker)
-            risk = get_annualized_std(ticker)
-
-            all_results.append(
-                {
-                    "ETF_Ticker": ticker,
-                    "ETF_Name": etf_name,
-                    "Group": group,
-                    "1_Week_Performance_%": round_value(week_perf),
-                    "1_Month_Performance_%": round_value(month_perf),
-                    "6_Month_Performance_%": round_value(six_month_perf),
-                    "YTD_Performance_%": round_value(ytd_perf),
-                    "Risk_StdDev_%": round_value(risk),
-                    "Trend_SMA": trend_sma,
-                }
-            )
+            if ticker not in exclusions:
+                jobs.append((ticker, group))
+
+    print("Prefetching price history...")
+    price_history.prefetch([ticker for ticker, _ in jobs])
+
+    print(f"Analyzing {len(jobs)} ETFs with up to {max_workers} workers...")
+    results = task_pool.run_in_pool(
+        lambda job: analyze_ticker(job[0], job[1], now), jobs, max_workers=max_workers
+    )
+    all_results = [result for result in results if result is not None]
 
     df = pd.DataFrame(all_results)
     df_sorted = df.sort_values(
@@ -491,6 +507,9 @@ def analyze_indian_etfs():
     print("India ETF Performance Analysis Complete!")
     print(f"Results saved to: {output_path}")
     print(f"Total ETFs analyzed: {len(all_results)}")
+    ticker_info.save()
+    ticker_info.print_stats()
+    price_history.print_stats()
     if ERROR_FLAGS:
         for ticker, reasons in ERROR_FLAGS.items():
             existing = exclusions.get(ticker, [])
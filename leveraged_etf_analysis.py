@@ -1,8 +1,13 @@
 import yfinance as yf
+from yfinance.exceptions import YFDataException
 from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
 import os
+import price_history
+import etf_metrics
+import task_pool
+import ticker_info
 
 # Static list of popular US leveraged ETFs and their underlying tickers
 LEVERAGED_ETFS = [
@@ -213,17 +218,21 @@ PERIODS = [
 OUTPUT_DIR = os.path.join(os.path.dirname(__file__), 'output')
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+def get_etf_universe():
+    """
+    Return every ticker analyze_all_etfs touches, in analysis order and without duplicates.
+    """
+    tickers = [etf for etf, _ in LEVERAGED_ETFS] + COUNTRY_ETFS + SECTOR_ETFS + SUBSECTOR_ETFS
+    return list(dict.fromkeys(tickers))
+
 def get_aum_from_yfinance(ticker):
     """
     Fetch AUM (Assets Under Management) from Yahoo Finance.
     Returns AUM in billions or None if unavailable.
     """
     try:
-        etf = yf.Ticker(ticker)
-        info = etf.info
-        
         # Yahoo Finance stores AUM as 'totalAssets'
-        total_assets = info.get('totalAssets', None)
+        total_assets = ticker_info.get_info(ticker, ['totalAssets'])['totalAssets']
         
         if total_assets and total_assets > 0:
             # Convert to billions
@@ -239,17 +248,21 @@ def get_aum_from_fund_info(ticker):
     This can be expanded to include other data providers.
     Returns AUM in billions or None if unavailable.
     """
-    try:
-        etf = yf.Ticker(ticker)
-        
+    def fetch_total_net_assets():
+        task_pool.throttle('yahoo')
         # Try to get from fund profile or other attributes
         # Some ETFs have 'nav' (Net Asset Value) information
-        fund_data = etf.funds_data
+        fund_data = yf.Ticker(ticker).funds_data
         if fund_data is not None and hasattr(fund_data, 'total_net_assets'):
-            assets = fund_data.total_net_assets
-            if assets and assets > 0:
-                return assets / 1_000_000_000
-        
+            return fund_data.total_net_assets
+        return None
+
+    try:
+        # Tickers without fund data raise YFDataException: cache that instead of retrying it
+        assets = ticker_info.get_value(ticker, 'fundTotalNetAssets', fetch_total_net_assets,
+                                       permanent=(YFDataException,))
+        if assets and assets > 0:
+            return assets / 1_000_000_000
         return None
     except Exception as e:
         # Silently fail as this is a secondary source
@@ -299,7 +312,7 @@ def format_aum(aum_billions):
         return f"${aum_billions*1000:.0f}M"
 
 def get_return(ticker, start_date, end_date):
-    data = yf.Ticker(ticker).history(start=start_date, end=end_date)
+    data = price_history.get_history(ticker, start_date, end_date)
     if data.empty or len(data) < 2:
         return None
     start_price = data["Close"].iloc[0]
@@ -317,7 +330,7 @@ def get_annualized_std(ticker, period_days=365):
     """
     now = datetime.now()
     start = now - timedelta(days=period_days)
-    data = yf.Ticker(ticker).history(start=start, end=now)
+    data = price_history.get_history(ticker, start, now)
     if data.empty or len(data) < 2:
         return None
     returns = data["Close"].pct_change().dropna()
@@ -326,199 +339,37 @@ def get_annualized_std(ticker, period_days=365):
     std = returns.std() * np.sqrt(252) * 100  # annualized, percent
     return std
 
-def get_etf_performance(ticker, days):
-    """
-    Get the performance of an ETF over a given number of days.
-    Returns percentage change or None if data unavailable.
-    """
-    now = datetime.now()
-    start = now - timedelta(days=days)
-    try:
-        data = yf.Ticker(ticker).history(start=start, end=now)
-        if data.empty or len(data) < 2:
-            return None
-        start_price = data["Close"].iloc[0]
-        end_price = data["Close"].iloc[-1]
-        return (end_price - start_price) / start_price * 100
-    except Exception as e:
-        print(f"Error fetching {ticker}: {e}")
-        return None
-
 def get_etf_name(ticker):
     """
     Get the long name of an ETF.
     """
     try:
-        info = yf.Ticker(ticker).info
-        return info.get('longName', ticker)
+        return ticker_info.get_info(ticker, ['longName'])['longName'] or ticker
     except:
         return ticker
 
-def calculate_trend_sma(ticker):
-    """
-    Determine trend using Simple Moving Averages (50-day and 200-day).
-    Returns: 'Uptrend', 'Downtrend', 'Sideways', or 'Unknown'
-    """
-    try:
-        now = datetime.now()
-        start = now - timedelta(days=250)  # Get enough data for 200-day SMA
-        data = yf.Ticker(ticker).history(start=start, end=now)
-        
-        if data.empty or len(data) < 50:
-            return "Unknown"
-        
-        # Calculate SMAs
-        sma_50 = data["Close"].rolling(window=50).mean()
-        sma_200 = data["Close"].rolling(window=200).mean()
-        
-        current_price = data["Close"].iloc[-1]
-        
-        # Check if we have enough data
-        if pd.isna(sma_50.iloc[-1]):
-            return "Unknown"
-        
-        # Determine trend based on price position relative to SMAs
-        above_50 = current_price > sma_50.iloc[-1]
-        
-        if len(data) >= 200 and not pd.isna(sma_200.iloc[-1]):
-            above_200 = current_price > sma_200.iloc[-1]
-            if above_50 and above_200:
-                return "Uptrend"
-            elif not above_50 and not above_200:
-                return "Downtrend"
-            else:
-                return "Sideways"
-        else:
-            # Only have 50-day SMA
-            if above_50:
-                return "Uptrend"
-            else:
-                return "Downtrend"
-    except Exception as e:
-        return "Unknown"
-
-def calculate_trend_ma_crossover(ticker):
-    """
-    Determine trend using Moving Average Crossover (50-day vs 200-day).
-    Golden Cross = Uptrend, Death Cross = Downtrend
-    Returns: 'Uptrend', 'Downtrend', 'Sideways', or 'Unknown'
-    """
-    try:
-        now = datetime.now()
-        start = now - timedelta(days=250)
-        data = yf.Ticker(ticker).history(start=start, end=now)
-        
-        if data.empty or len(data) < 200:
-            return "Unknown"
-        
-        sma_50 = data["Close"].rolling(window=50).mean()
-        sma_200 = data["Close"].rolling(window=200).mean()
-        
-        if pd.isna(sma_50.iloc[-1]) or pd.isna(sma_200.iloc[-1]):
-            return "Unknown"
-        
-        # Golden Cross: 50-day > 200-day = Uptrend
-        # Death Cross: 50-day < 200-day = Downtrend
-        diff = sma_50.iloc[-1] - sma_200.iloc[-1]
-        diff_pct = (diff / sma_200.iloc[-1]) * 100
-        
-        if diff_pct > 2:  # 50-day significantly above 200-day
-            return "Uptrend"
-        elif diff_pct < -2:  # 50-day significantly below 200-day
-            return "Downtrend"
-        else:
-            return "Sideways"
-    except Exception as e:
-        return "Unknown"
-
-def calculate_trend_linear_regression(ticker, days=30):
-    """
-    Determine trend using linear regression slope over recent period.
-    Returns: 'Uptrend', 'Downtrend', 'Sideways', or 'Unknown'
-    """
-    try:
-        now = datetime.now()
-        start = now - timedelta(days=days + 10)  # Extra days for safety
-        data = yf.Ticker(ticker).history(start=start, end=now)
-        
-        if data.empty or len(data) < 10:
-            return "Unknown"
-        
-        # Take last 'days' data points
-        recent_data = data["Close"].tail(min(days, len(data)))
-        
-        # Perform linear regression
-        x = np.arange(len(recent_data))
-        y = recent_data.values
-        
-        # Calculate slope
-        coefficients = np.polyfit(x, y, 1)
-        slope = coefficients[0]
-        
-        # Normalize slope by average price
-        avg_price = np.mean(y)
-        normalized_slope = (slope / avg_price) * 100  # Slope as percentage of price
-        
-        # Determine trend based on slope
-        if normalized_slope > 0.1:  # Positive slope
-            return "Uptrend"
-        elif normalized_slope < -0.1:  # Negative slope
-            return "Downtrend"
-        else:
-            return "Sideways"
-    except Exception as e:
-        return "Unknown"
-
-def calculate_trend_momentum(ticker):
-    """
-    Determine trend using price momentum (comparing recent periods).
-    Returns: 'Uptrend', 'Downtrend', 'Sideways', or 'Unknown'
-    """
-    try:
-        now = datetime.now()
-        start = now - timedelta(days=90)
-        data = yf.Ticker(ticker).history(start=start, end=now)
-        
-        if data.empty or len(data) < 30:
-            return "Unknown"
-        
-        # Compare recent 2 weeks vs previous 2 weeks
-        recent_14d = data["Close"].tail(14).mean()
-        prev_14d = data["Close"].tail(28).head(14).mean()
-        
-        if pd.isna(recent_14d) or pd.isna(prev_14d):
-            return "Unknown"
-        
-        change_pct = ((recent_14d - prev_14d) / prev_14d) * 100
-        
-        if change_pct > 2:
-            return "Uptrend"
-        elif change_pct < -2:
-            return "Downtrend"
-        else:
-            return "Sideways"
-    except Exception as e:
-        return "Unknown"
-
-def analyze_all_etfs():
+def analyze_all_etfs(max_workers=task_pool.DEFAULT_MAX_WORKERS):
     """
     Analyze leveraged, country, sector, and subsector ETFs for various performance periods.
+    Per-ticker name/AUM lookups run on a bounded thread pool (max_workers=1 runs serially).
     Output results to recent-etf-performance-{ddmmyyyy}.csv
     """
     now = datetime.now()
     date_str = now.strftime("%d%m%Y")
     
-    all_results = []
+    # Pull the whole universe in a few grouped requests before computing any metrics
+    print("Prefetching price history for the ETF universe...")
+    universe = get_etf_universe()
+    closes, _ = price_history.prefetch(universe)
+    print(f"  Loaded prices for {closes.shape[1]} tickers over {closes.shape[0]} days")
+    
+    # Returns and trend indicators for every ticker in one pass over the Close matrix
+    metrics = etf_metrics.compute_etf_metrics(closes.reindex(columns=universe), now)
     
     def analyze_etf(ticker, group):
         """Helper function to analyze a single ETF with all metrics"""
         print(f"  Analyzing {ticker}...")
-        
-        # Get performance metrics
-        week_perf = get_etf_performance(ticker, 7)
-        month_perf = get_etf_performance(ticker, 30)
-        six_month_perf = get_etf_performance(ticker, 182)
-        ytd_perf = get_ytd_return(ticker)
+        row = metrics.loc[ticker]
         
         # Get ETF name
         etf_name = get_etf_name(ticker)
@@ -530,51 +381,32 @@ def analyze_all_etfs():
         if aum_billions:
             print(f"    AUM: {aum_formatted} (from {aum_source})")
         
-        # Calculate trend indicators
-        trend_sma = calculate_trend_sma(ticker)
-        trend_ma_cross = calculate_trend_ma_crossover(ticker)
-        trend_regression = calculate_trend_linear_regression(ticker)
-        trend_momentum = calculate_trend_momentum(ticker)
-        
         return {
             "ETF_Ticker": ticker,
             "ETF_Name": etf_name,
             "Group": group,
             "AUM": aum_formatted,
             "AUM_Billions": aum_billions,
-            "1_Week_Performance_%": week_perf,
-            "1_Month_Performance_%": month_perf,
-            "6_Month_Performance_%": six_month_perf,
-            "YTD_Performance_%": ytd_perf,
-            "Trend_SMA": trend_sma,
-            "Trend_MA_Crossover": trend_ma_cross,
-            "Trend_Linear_Regression": trend_regression,
-            "Trend_Momentum": trend_momentum
+            "1_Week_Performance_%": row["1_Week_Performance_%"],
+            "1_Month_Performance_%": row["1_Month_Performance_%"],
+            "6_Month_Performance_%": row["6_Month_Performance_%"],
+            "YTD_Performance_%": row["YTD_Performance_%"],
+            "Trend_SMA": row["Trend_SMA"],
+            "Trend_MA_Crossover": row["Trend_MA_Crossover"],
+            "Trend_Linear_Regression": row["Trend_Linear_Regression"],
+            "Trend_Momentum": row["Trend_Momentum"]
         }
     
-    print("Analyzing Leveraged ETFs...")
-    # Analyze leveraged ETFs
-    for etf, underlying in LEVERAGED_ETFS:
-        result = analyze_etf(etf, "Leveraged")
-        all_results.append(result)
-    
-    print("\nAnalyzing Country ETFs...")
-    # Analyze country ETFs
-    for etf in COUNTRY_ETFS:
-        result = analyze_etf(etf, "Country")
-        all_results.append(result)
-    
-    print("\nAnalyzing Sector ETFs...")
-    # Analyze sector ETFs
-    for etf in SECTOR_ETFS:
-        result = analyze_etf(etf, "Sector")
-        all_results.append(result)
-    
-    print("\nAnalyzing Subsector ETFs...")
-    # Analyze subsector ETFs
-    for etf in SUBSECTOR_ETFS:
-        result = analyze_etf(etf, "Subsector")
-        all_results.append(result)
+    # Leveraged, country, sector, then subsector ETFs; results keep this order
+    jobs = (
+        [(etf, "Leveraged") for etf, underlying in LEVERAGED_ETFS]
+        + [(etf, "Country") for etf in COUNTRY_ETFS]
+        + [(etf, "Sector") for etf in SECTOR_ETFS]
+        + [(etf, "Subsector") for etf in SUBSECTOR_ETFS]
+    )
+    print(f"Analyzing {len(jobs)} ETFs with up to {max_workers} workers...")
+    results = task_pool.run_in_pool(lambda job: analyze_etf(*job), jobs, max_workers=max_workers)
+    all_results = [result for result in results if result is not None]
     
     # Create DataFrame and sort
     df = pd.DataFrame(all_results)
@@ -595,6 +427,9 @@ def analyze_all_etfs():
     print(f"ETF Performance Analysis Complete!")
     print(f"Results saved to: {output_path}")
     print(f"Total ETFs analyzed: {len(all_results)}")
+    ticker_info.save()
+    ticker_info.print_stats()
+    price_history.print_stats()
     print(f"{'='*80}")
     
     # Display top 10 performers
@@ -615,6 +450,11 @@ def analyze_all_etfs():
 def analyze_leveraged_etfs():
     now = datetime.now()
     results = []
+    # Longest period is 5 years; seed the store for every ETF and underlying in one pass
+    price_history.prefetch(
+        [t for pair in LEVERAGED_ETFS for t in pair],
+        days=max(days for _, days in PERIODS if days),
+    )
     print(f"{'ETF':<6} {'Underlying':<10} {'Period':<8} {'ETF %':>8} {'Und %':>8} {'Diff %':>8}")
     print("-" * 50)
     for etf, underlying in LEVERAGED_ETFS:
@@ -689,27 +529,27 @@ def analyze_leveraged_etfs():
 
         # fetch price history from start of year to now for start/current prices
         try:
-            hist_etf = yf.Ticker(etf).history(start=start_of_year, end=now)
+            hist_etf = price_history.get_history(etf, start_of_year, now)
             if not hist_etf.empty:
                 etf_start_price = hist_etf["Close"].iloc[0]
                 etf_current_price = hist_etf["Close"].iloc[-1]
             else:
                 etf_start_price = None
                 # attempt to get most recent price
-                recent = yf.Ticker(etf).history(period="7d")
+                recent = price_history.get_history(etf, period="7d")
                 etf_current_price = recent["Close"].iloc[-1] if not recent.empty else None
         except Exception:
             etf_start_price = None
             etf_current_price = None
 
         try:
-            hist_und = yf.Ticker(underlying).history(start=start_of_year, end=now)
+            hist_und = price_history.get_history(underlying, start_of_year, now)
             if not hist_und.empty:
                 und_start_price = hist_und["Close"].iloc[0]
                 und_current_price = hist_und["Close"].iloc[-1]
             else:
                 und_start_price = None
-                recent2 = yf.Ticker(underlying).history(period="7d")
+                recent2 = price_history.get_history(underlying, period="7d")
                 und_current_price = recent2["Close"].iloc[-1] if not recent2.empty else None
         except Exception:
             und_start_price = None
@@ -744,6 +584,9 @@ if __name__ == "__main__":
         print("Running legacy leveraged ETF analysis...")
         analyze_leveraged_etfs()
     else:
+        workers = task_pool.DEFAULT_MAX_WORKERS
+        if "--workers" in sys.argv:
+            workers = int(sys.argv[sys.argv.index("--workers") + 1])
         print("Running comprehensive ETF analysis (Leveraged, Country, Sector)...")
-        analyze_all_etfs()
+        analyze_all_etfs(max_workers=workers)
 
@@ -1,6 +1,7 @@
 import csv
 import re
-import yfinance as yf
+import price_history
+import ticker_info
 from datetime import datetime, timedelta
 import numpy as np
 from scipy.stats import linregress
@@ -21,15 +22,14 @@ def extract_ticker(security_desc):
 
 def get_beta(ticker):
     try:
-        info = yf.Ticker(ticker).info
-        beta = info.get("beta", "")
+        beta = ticker_info.get_info(ticker, ["beta"])["beta"]
         return round(beta, 3) if beta is not None else ""
     except Exception:
         return ""
 
 def get_trend(ticker):
     try:
-        hist = yf.Ticker(ticker).history(period='30d')['Close']
+        hist = price_history.get_close(ticker, period='30d')
         if len(hist) >= 15:
             from scipy.stats import linregress
             x = range(len(hist))
@@ -0,0 +1,310 @@
+import csv
+import hashlib
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+import csv_tail
+import db_schema
+import record_writer
+
+# Offline benchmark for the news sentiment path. FakeOllamaServer answers
+# /api/generate like Ollama (single-word labels, or a JSON array for batched
+# prompts) with per-model latency, error rate and concurrency, so sequential,
+# concurrent, early-exit, batched and pipeline modes can be compared without a GPU.
+
+# Per-model behaviour: lognormal latency (median seconds, sigma), extra seconds per
+# item in a batched prompt, error rate, requests served at once, and answer weights.
+MODEL_PROFILES = {
+    'gemma3:1b': {'median': 0.25, 'sigma': 0.3, 'per_item': 0.04, 'error_rate': 0.01, 'parallel': 2,
+                  'answers': {'positive': 0.4, 'negative': 0.25, 'neutral': 0.35}},
+    'mistral:7b': {'median': 0.9, 'sigma': 0.35, 'per_item': 0.12, 'error_rate': 0.02, 'parallel': 2,
+                   'answers': {'positive': 0.35, 'negative': 0.3, 'neutral': 0.35}},
+    'llama3.2:latest': {'median': 0.5, 'sigma': 0.3, 'per_item': 0.08, 'error_rate': 0.01, 'parallel': 2,
+                        'answers': {'positive': 0.38, 'negative': 0.27, 'neutral': 0.35}},
+    'gpt-oss:20b': {'median': 3.0, 'sigma': 0.4, 'per_item': 0.4, 'error_rate': 0.02, 'parallel': 1,
+                    'answers': {'positive': 0.35, 'negative': 0.3, 'neutral': 0.35}},
+}
+DEFAULT_PROFILE = {'median': 0.5, 'sigma': 0.3, 'per_item': 0.08, 'error_rate': 0.0, 'parallel': 2,
+                   'answers': {'positive': 0.34, 'negative': 0.33, 'neutral': 0.33}}
+
+# Chance that a batched answer comes back as prose instead of a JSON array.
+BATCH_FORMAT_ERROR_RATE = 0.05
+
+MODES = ('sequential', 'concurrent', 'early_exit', 'batched', 'pipeline')
+
+# Bytes per read when the written records are read back through csv_tail.
+CHECK_BLOCK_SIZE = 4096
+
+
+class FakeOllamaServer:
+    """
+    Threaded HTTP server implementing POST /api/generate. `speed` scales every latency
+    (0.1 runs ten times faster). Answers are a deterministic function of (model, news text),
+    so every mode sees the same labels.
+    """
+
+    def __init__(self, profiles=None, speed=1.0, seed=0, port=0):
+        self.profiles = profiles or MODEL_PROFILES
+        self.speed = speed
+        self.seed = seed
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._slots = {}
+        self._rng = random.Random(seed)
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path != '/api/generate':
+                    self.send_error(404)
+                    return
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                status, payload = server.generate(json.loads(body or b'{}'))
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/api/generate"
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _profile(self, model):
+        return self.profiles.get(model, DEFAULT_PROFILE)
+
+    def _slot(self, model):
+        with self._lock:
+            if model not in self._slots:
+                self._slots[model] = threading.Semaphore(self._profile(model)['parallel'])
+            return self._slots[model]
+
+    def _label(self, model, text):
+        weights = self._profile(model)['answers']
+        digest = hashlib.sha256(f"{self.seed}|{model}|{text}".encode('utf-8')).digest()
+        point = int.from_bytes(digest[:8], 'big') / 2 ** 64
+        for label, weight in weights.items():
+            point -= weight / sum(weights.values())
+            if point < 0:
+                return label
+        return label
+
+    def generate(self, request):
+        model = request.get('model', '')
+        prompt = request.get('prompt', '')
+        profile = self._profile(model)
+        batch = re.search(r'following (\d+) numbered news items', prompt)
+        news = prompt.split('News:', 1)[-1].strip()
+        # Numbered items start a line; summaries may contain line breaks of their own
+        items = [re.sub(r'^\d+\.\s*', '', item) for item in re.split(r'\n(?=\d+\.\s)', news)] if batch else [news]
+        with self._lock:
+            self.requests += 1
+            latency = self._rng.lognormvariate(np.log(profile['median']), profile['sigma'])
+            failed = self._rng.random() < profile['error_rate']
+            garbled = batch and self._rng.random() < BATCH_FORMAT_ERROR_RATE
+        latency += profile['per_item'] * (len(items) - 1)
+        with self._slot(model):
+            time.sleep(latency * self.speed)
+        if failed:
+            return 500, {'error': 'simulated model failure'}
+        labels = [self._label(model, item) for item in items]
+        if not batch:
+            answer = labels[0].capitalize()
+        elif garbled:
+            answer = 'The items are mostly ' + ', '.join(labels)
+        else:
+            answer = json.dumps(labels)
+        return 200, {'model': model, 'created_at': datetime.now(timezone.utc).isoformat(),
+                     'response': answer, 'done': True}
+
+
+def make_news(symbols, items_per_symbol):
+    """
+    Synthetic {symbol: [news dict, ...]} shaped like robin_stocks get_news results. Every third
+    summary has a second paragraph after \\r\\n, as scraped news text can.
+    """
+    published = datetime.now(timezone.utc).isoformat()
+    return {
+        symbol: [{'title': f"{symbol} headline {n}",
+                  'summary': f"Synthetic summary {n} for {symbol}." + ("\r\nMore detail." if n % 3 == 0 else ""),
+                  'url': f"https://example.com/{symbol}/{n}", 'published_at': published}
+                 for n in range(items_per_symbol)]
+        for symbol in symbols
+    }
+
+
+def check_record_keys(csv_file, watermark):
+    """
+    (rows, distinct keys) for the rows appended to csv_file since watermark (advanced in place),
+    keyed like llm_response_record's unique key; fewer keys than rows means INSERT IGNORE
+    would drop records when they are loaded into MySQL.
+    """
+    rows, keys = 0, set()
+    if not os.path.exists(csv_file):
+        return rows, 0
+    # Small blocks so record boundaries are found next to line breaks inside quoted prompts
+    for block in csv_tail.iter_appended_rows(csv_file, watermark, block_size=CHECK_BLOCK_SIZE):
+        for row in block:
+            rows += 1
+            keys.add((row['Symbol'], row['Model'], db_schema.to_datetime(row['Request Time']),
+                      db_schema.prompt_hash(row['Prompt'])))
+    return rows, len(keys)
+
+
+def percentiles(latencies):
+    if not latencies:
+        return None
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {'p50': p50, 'p95': p95, 'p99': p99}
+
+
+def run_mode(mode, url, news, logf, batch_size, llm_workers, models=None):
+    """Drive one mode over all items. Returns (wall seconds, per-item latencies, majorities)."""
+    import robinhood
+    portfolio = robinhood.RobinhoodPortfolio(config_path=None)
+    items = [(symbol, n['title'], n['summary']) for symbol, entries in news.items() for n in entries]
+    latencies, majorities = [], []
+    start = time.time()
+    if mode == 'batched':
+        for symbol, entries in news.items():
+            pairs = [(n['title'], n['summary']) for n in entries]
+            for offset in range(0, len(pairs), batch_size):
+                chunk = pairs[offset:offset + batch_size]
+                t0 = time.time()
+                votes = portfolio.analyze_sentiment_batch(symbol, chunk, url, logf, models=models,
+                                                          batch_size=batch_size, use_cache=False)
+                latencies += [time.time() - t0] * len(chunk)
+                majorities += [majority for majority, _ in votes]
+    elif mode == 'pipeline':
+        original = robinhood.r.robinhood.stocks.get_news
+        robinhood.r.robinhood.stocks.get_news = lambda symbol: news.get(symbol, [])
+        holdings = os.path.join(os.path.dirname(logf.name), 'holdings.csv')
+        with open(holdings, 'w', encoding='utf-8') as handle:
+            handle.write('Symbol\n' + '\n'.join(news) + '\n')
+        try:
+            portfolio.fetch_and_analyze_news(holdings, os.path.join(os.path.dirname(logf.name), 'news.txt'), url,
+                                             os.path.join(os.path.dirname(logf.name), 'pipeline_log.txt'),
+                                             llm_workers=llm_workers, use_cache=False)
+        finally:
+            robinhood.r.robinhood.stocks.get_news = original
+        # Per-item latency is not observable through the pipeline; only throughput is reported
+        return time.time() - start, [], []
+    else:
+        for symbol, headline, summary in items:
+            t0 = time.time()
+            majority, _ = portfolio.analyze_sentiment_votes(symbol, headline, summary, url, logf, models=models,
+                                                            concurrent=(mode != 'sequential'),
+                                                            early_exit=(mode == 'early_exit'), use_cache=False)
+            latencies.append(time.time() - t0)
+            majorities.append(majority)
+    return time.time() - start, latencies, majorities
+
+
+def run_benchmark(modes=MODES, symbols=4, items_per_symbol=5, batch_size=5, llm_workers=2, speed=1.0, seed=0):
+    """
+    Start a FakeOllamaServer, run every mode over the same synthetic news and print
+    items/sec, p50/p95/p99 per-item latency and agreement with the sequential majorities.
+    Every mode's llm_response_record.csv rows must have distinct unique keys, and reading them
+    back through csv_tail must yield every record (AssertionError otherwise). All CSV/log output
+    goes to a temporary directory, not output/.
+    """
+    import robinhood
+    news = make_news([f"SYM{n}" for n in range(symbols)], items_per_symbol)
+    total = symbols * items_per_symbol
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir, FakeOllamaServer(speed=speed, seed=seed) as server:
+        original_output = robinhood.OUTPUT_DIR
+        robinhood.OUTPUT_DIR = workdir
+        try:
+            records = os.path.join(workdir, 'llm_response_record.csv')
+            watermark = csv_tail.new_watermark()
+            with open(os.path.join(workdir, 'ollama_bench_log.txt'), 'w', encoding='utf-8') as logf:
+                for mode in modes:
+                    before = server.requests
+                    elapsed, latencies, majorities = run_mode(mode, server.url, news, logf, batch_size, llm_workers)
+                    record_writer.flush()
+                    rows, keys = check_record_keys(records, watermark)
+                    results[mode] = {'elapsed': elapsed, 'requests': server.requests - before,
+                                     'latencies': latencies, 'majorities': majorities, 'rows': rows, 'keys': keys}
+            # The incremental reads must see exactly the records a full parse of the file does
+            with open(records, newline='', encoding='utf-8') as handle:
+                written = sum(1 for _ in csv.DictReader(handle))
+            read = sum(result['rows'] for result in results.values())
+            assert read == written, f"csv_tail read {read} records from {records}, the file has {written}"
+        finally:
+            robinhood.OUTPUT_DIR = original_output
+
+    reference = results.get('sequential', {}).get('majorities')
+    print(f"\nOllama sentiment benchmark: {total} items ({symbols} symbols x {items_per_symbol}), "
+          f"speed={speed}, batch_size={batch_size}, llm_workers={llm_workers}")
+    print(f"{'Mode':<12}{'Items/s':>9}{'Requests':>10}{'p50 (s)':>9}{'p95 (s)':>9}{'p99 (s)':>9}{'Agree':>8}"
+          f"{'Rows':>7}{'Keys':>7}")
+    for mode, result in results.items():
+        q = percentiles(result['latencies'])
+        agree = 'n/a'
+        if reference and result['majorities']:
+            matches = sum(a == b for a, b in zip(reference, result['majorities']))
+            agree = f"{matches / len(reference):.0%}"
+        quantiles = ''.join(f"{q[k]:>9.3f}" for k in ('p50', 'p95', 'p99')) if q else f"{'n/a':>9}" * 3
+        print(f"{mode:<12}{total / result['elapsed']:>9.2f}{result['requests']:>10}{quantiles}{agree:>8}"
+              f"{result['rows']:>7}{result['keys']:>7}")
+    lost = {mode: result['rows'] - result['keys'] for mode, result in results.items() if result['rows'] != result['keys']}
+    assert not lost, f"Rows sharing a unique key (would be dropped by INSERT IGNORE): {lost}"
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+
+    def option(name, default, cast):
+        if name in sys.argv:
+            return cast(sys.argv[sys.argv.index(name) + 1])
+        return default
+
+    if "--serve" in sys.argv:
+        # Stand-alone fake server, e.g. for pointing main.py at it
+        fake = FakeOllamaServer(speed=option("--speed", 1.0, float), port=option("--port", 11434, int))
+        print(f"Fake Ollama listening on {fake.url} (Ctrl+C to stop)")
+        try:
+            fake.httpd.serve_forever()
+        except KeyboardInterrupt:
+            fake.stop()
+    else:
+        run_benchmark(
+            modes=option("--modes", ",".join(MODES), str).split(","),
+            symbols=option("--symbols", 4, int),
+            items_per_symbol=option("--items", 5, int),
+            batch_size=option("--batch-size", 5, int),
+            llm_workers=option("--workers", 2, int),
+            speed=option("--speed", 1.0, float),
+            seed=option("--seed", 0, int),
+        )
@@ -0,0 +1,50 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Shared keep-alive HTTP session for Ollama /api/generate calls, so concurrent
+# model requests reuse pooled connections instead of opening one per post.
+
+DEFAULT_OLLAMA_URL = 'http://localhost:11434/api/generate'
+POOL_SIZE = 16
+
+# News items sent to Ollama at once by the news pipeline (each item fans out to every model).
+# Keep in line with the server's OLLAMA_NUM_PARALLEL.
+MAX_PARALLEL_ITEMS = 2
+
+# Per-model request timeouts in seconds (connect, read); larger models get longer reads.
+DEFAULT_TIMEOUT = (5, 120)
+MODEL_TIMEOUTS = {
+    'gemma3:1b': (5, 60),
+    'mistral:7b': (5, 120),
+    'llama3.2:latest': (5, 90),
+    'gemma3n:latest': (5, 120),
+    'gpt-oss:20b': (5, 300),
+}
+
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+
+
+def get_session():
+    """Process-wide requests.Session with a connection pool sized for concurrent model calls."""
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _SESSION = session
+        return _SESSION
+
+
+def timeout_for(model):
+    return MODEL_TIMEOUTS.get(model, DEFAULT_TIMEOUT)
+
+
+def generate(url, model, prompt, timeout=None):
+    """POST a non-streaming generate request for model and return the requests.Response."""
+    payload = {"model": model, "prompt": prompt, "stream": False}
+    return get_session().post(url, json=payload, timeout=timeout or timeout_for(model))
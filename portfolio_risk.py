@@ -0,0 +1,184 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import price_history
+
+# Matrix-based portfolio risk: one aligned daily-returns matrix per symbol set,
+# covariance estimates cached per day, and variance/volatility/risk contributions
+# computed with plain numpy so recomputing for new weights is effectively free.
+
+TRADING_DAYS = 252
+DEFAULT_LOOKBACK_DAYS = 365
+MIN_OBSERVATIONS = 60
+EWMA_LAMBDA = 0.94  # RiskMetrics daily decay
+COVARIANCE_METHODS = ('sample', 'ewma', 'shrinkage')
+
+# Least recently used returns matrices (and covariances) are evicted beyond these counts,
+# so a long-running process asking for many symbol sets or days stays bounded.
+MAX_RETURNS_ENTRIES = 32
+MAX_COV_ENTRIES = MAX_RETURNS_ENTRIES * len(COVARIANCE_METHODS)
+
+_RETURNS_CACHE = OrderedDict()
+_COV_CACHE = OrderedDict()
+_LOCK = threading.RLock()
+STATS = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+
+def _cache_get(cache, key):
+    with _LOCK:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+
+def _cache_put(cache, key, value, max_entries):
+    with _LOCK:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > max_entries:
+            cache.popitem(last=False)
+            STATS['evictions'] += 1
+
+
+def aggregate_weights(holdings):
+    """
+    Collapse a holdings frame (Symbol, Equity) into one weight per symbol.
+    Symbols held in several accounts are summed, so weights line up with the returns columns.
+    """
+    equity = pd.to_numeric(holdings['Equity'], errors='coerce').fillna(0)
+    by_symbol = equity.groupby(holdings['Symbol']).sum()
+    by_symbol = by_symbol[by_symbol != 0]
+    return by_symbol / by_symbol.sum()
+
+
+def returns_matrix(symbols, lookback_days=DEFAULT_LOOKBACK_DAYS):
+    """
+    Aligned date-by-symbol matrix of daily returns over the lookback window.
+    Symbols with fewer than MIN_OBSERVATIONS returns are dropped; the remaining
+    columns are restricted to dates where every symbol has a return.
+    Cached per (symbols, lookback, day), keeping the MAX_RETURNS_ENTRIES most recently used.
+    """
+    symbols = sorted(set(symbols))
+    key = (tuple(symbols), lookback_days, datetime.now().date())
+    returns = _cache_get(_RETURNS_CACHE, key)
+    if returns is not None:
+        STATS['hits'] += 1
+        return returns
+    STATS['misses'] += 1
+    closes, _ = price_history.prefetch(symbols, days=lookback_days)
+    closes = closes[closes.index >= pd.Timestamp.now().normalize() - pd.Timedelta(days=lookback_days)]
+    returns = closes.reindex(columns=symbols).pct_change(fill_method=None).iloc[1:]
+    returns = returns.loc[:, returns.notna().sum() >= MIN_OBSERVATIONS].dropna()
+    _cache_put(_RETURNS_CACHE, key, returns, MAX_RETURNS_ENTRIES)
+    return returns
+
+
+def sample_covariance(returns):
+    x = returns - returns.mean(axis=0)
+    return x.T @ x / (len(x) - 1)
+
+
+def ewma_covariance(returns, lam=EWMA_LAMBDA):
+    """Exponentially weighted covariance; the latest day gets weight (1 - lam), normalized to sum to 1."""
+    n = len(returns)
+    weights = (1 - lam) * lam ** np.arange(n - 1, -1, -1)
+    weights /= weights.sum()
+    mean = weights @ returns
+    x = returns - mean
+    return x.T @ (x * weights[:, None])
+
+
+def shrinkage_covariance(returns):
+    """
+    Ledoit-Wolf covariance shrunk towards a scaled identity, with the closed-form
+    optimal shrinkage intensity. Returns (covariance, intensity).
+    """
+    n, p = returns.shape
+    x = returns - returns.mean(axis=0)
+    sample = x.T @ x / n
+    mu = np.trace(sample) / p
+    target = mu * np.eye(p)
+    delta = ((sample - target) ** 2).sum()
+    outer = np.einsum('ti,tj->tij', x, x)
+    beta = min(((outer - sample) ** 2).sum() / n ** 2, delta)
+    intensity = beta / delta if delta > 0 else 0.0
+    return intensity * target + (1 - intensity) * sample, intensity
+
+
+def covariance(returns, method='sample'):
+    """
+    Daily covariance matrix (numpy array) of an aligned returns frame, cached per
+    returns matrix and method (the MAX_COV_ENTRIES most recently used are kept).
+    method is one of COVARIANCE_METHODS.
+    """
+    if method not in COVARIANCE_METHODS:
+        raise ValueError(f"Unknown covariance method: {method}")
+    key = (id(returns), method)
+    cached = _cache_get(_COV_CACHE, key)
+    if cached is not None and cached[0] is returns:
+        return cached[1]
+    values = returns.to_numpy(dtype=float)
+    if method == 'sample':
+        cov = sample_covariance(values)
+    elif method == 'ewma':
+        cov = ewma_covariance(values)
+    else:
+        cov, _ = shrinkage_covariance(values)
+    _cache_put(_COV_CACHE, key, (returns, cov), MAX_COV_ENTRIES)
+    return cov
+
+
+def risk_contributions(weights, cov):
+    """
+    Portfolio variance, annualized volatility and per-asset risk split for weight vector w:
+    marginal = (Cov w) / vol, component = w * marginal (components sum to vol).
+    """
+    w = np.asarray(weights, dtype=float)
+    cov_w = cov @ w
+    variance = float(w @ cov_w)
+    vol = np.sqrt(variance)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        marginal = cov_w / vol
+    component = w * marginal
+    annual = np.sqrt(TRADING_DAYS)
+    return {
+        'variance': variance,
+        'daily_vol': vol,
+        'annual_vol': vol * annual,
+        'marginal': marginal * annual,
+        'component': component * annual,
+        'percent': component / vol if vol else np.full_like(w, np.nan),
+    }
+
+
+def portfolio_risk(weights, lookback_days=DEFAULT_LOOKBACK_DAYS, methods=COVARIANCE_METHODS):
+    """
+    Risk for a Series of weights indexed by symbol. Weights of symbols without enough
+    history are dropped and the rest renormalized (reported under 'excluded').
+    Returns {'symbols', 'weights', 'excluded', 'observations', method: risk_contributions(...)}.
+    """
+    returns = returns_matrix(weights.index, lookback_days)
+    symbols = list(returns.columns)
+    kept = weights.reindex(symbols)
+    result = {
+        'symbols': symbols,
+        'weights': (kept / kept.sum()).to_numpy() if symbols else np.array([]),
+        'excluded': sorted(set(weights.index) - set(symbols)),
+        'observations': len(returns),
+    }
+    if not symbols or len(returns) < 2:
+        return result
+    for method in methods:
+        result[method] = risk_contributions(result['weights'], covariance(returns, method))
+    return result
+
+
+def clear_cache():
+    with _LOCK:
+        _RETURNS_CACHE.clear()
+        _COV_CACHE.clear()
@@ -0,0 +1,377 @@
+import json
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+import task_pool
+
+# Shared local OHLCV store. Each ticker is fetched once over the longest window any
+# caller has asked for and written to output/price_store/{ticker}.parquet; later days
+# append only the new bars, and every shorter lookback is served as a slice of that frame.
+OUTPUT_DIR = os.path.join(os.path.dirname(__file__), 'output')
+PRICE_STORE_DIR = os.path.join(OUTPUT_DIR, 'price_store')
+os.makedirs(PRICE_STORE_DIR, exist_ok=True)
+INDEX_FILE = os.path.join(PRICE_STORE_DIR, 'index.json')
+
+# Covers the daily jobs: 365d risk, 250d SMA window and 1y portfolio risk.
+DEFAULT_LOOKBACK_DAYS = 400
+
+# Relative change in an already-stored Close that signals Yahoo re-adjusted history.
+ADJUSTMENT_TOLERANCE = 1e-4
+
+_FRAMES = {}
+_INDEX = None
+_INDEX_LOCK = threading.RLock()
+_TICKER_LOCKS = {}
+STATS = {'hits': 0, 'full_fetches': 0, 'incremental_fetches': 0, 'backfills': 0}
+
+
+def _load_index():
+    global _INDEX
+    with _INDEX_LOCK:
+        if _INDEX is None:
+            try:
+                with open(INDEX_FILE, 'r', encoding='utf-8') as handle:
+                    _INDEX = json.load(handle)
+            except Exception:
+                _INDEX = {}
+        return _INDEX
+
+
+def _save_index():
+    with _INDEX_LOCK:
+        with open(INDEX_FILE, 'w', encoding='utf-8') as handle:
+            json.dump(_load_index(), handle, indent=2, sort_keys=True)
+
+
+def _ticker_lock(ticker):
+    with _INDEX_LOCK:
+        return _TICKER_LOCKS.setdefault(ticker, threading.Lock())
+
+
+def _store_path(ticker):
+    safe = re.sub(r'[^A-Za-z0-9._-]', '_', ticker)
+    return os.path.join(PRICE_STORE_DIR, f"{safe}.parquet")
+
+
+def parse_period(period):
+    """
+    Convert a yfinance-style period string ('7d', '30d', '6mo', '1y', 'ytd') to calendar days.
+    """
+    period = period.strip().lower()
+    now = datetime.now()
+    if period == 'ytd':
+        return (now - datetime(now.year, 1, 1)).days + 1
+    match = re.fullmatch(r'(\d+)(d|wk|mo|y)', period)
+    if not match:
+        raise ValueError(f"Unsupported period: {period}")
+    count, unit = int(match.group(1)), match.group(2)
+    return count * {'d': 1, 'wk': 7, 'mo': 31, 'y': 366}[unit]
+
+
+def _normalize(data):
+    if data is None or data.empty:
+        return pd.DataFrame()
+    data = data.copy()
+    index = pd.DatetimeIndex(data.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    data.index = index.normalize()
+    data.index.name = 'Date'
+    return data[~data.index.duplicated(keep='last')].sort_index()
+
+
+def _fetch(ticker, start, end=None):
+    if end is None:
+        end = datetime.now() + timedelta(days=1)
+
+    def request():
+        task_pool.throttle('yahoo')
+        return yf.Ticker(ticker).history(start=start, end=end)
+
+    return _normalize(task_pool.call_with_retry(request))
+
+
+def _read_store(ticker):
+    path = _store_path(ticker)
+    if not os.path.exists(path):
+        return None
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        print(f"  Warning: Could not read stored prices for {ticker}: {e}")
+        return None
+
+
+def _stored_frame(ticker):
+    frame = _FRAMES.get(ticker)
+    if frame is None:
+        frame = _read_store(ticker)
+    return frame
+
+
+def _anchor_date(stored):
+    """
+    Date to resume fetching from: the second-to-last stored bar, so the last bar
+    (possibly written mid-session) is refreshed and one complete bar overlaps.
+    """
+    return stored.index[-2] if len(stored) >= 2 else stored.index[-1]
+
+
+def _merge_incremental(ticker, stored, new):
+    """
+    Append bars fetched from _anchor_date(stored) onward to the stored frame.
+    Returns None when the overlapping bar's Close moved or a dividend/split arrived that the
+    stored frame does not already hold, meaning Yahoo re-adjusted history and the ticker needs
+    a full backfill.
+    """
+    if new.empty:
+        return stored
+    anchor = _anchor_date(stored)
+    if anchor in new.index:
+        old_close = stored.at[anchor, 'Close']
+        new_close = new.at[anchor, 'Close']
+        if not np.isclose(old_close, new_close, rtol=ADJUSTMENT_TOLERANCE, atol=0):
+            print(f"  {ticker}: adjusted close changed ({old_close:.4f} -> {new_close:.4f}), backfilling")
+            return None
+    later = new[new.index > anchor]
+    for column in ('Dividends', 'Stock Splits'):
+        if column not in later.columns:
+            continue
+        # The last stored bar is fetched again; an action it already carries is not new
+        actions = later[column].fillna(0)
+        known = stored[column].reindex(later.index).fillna(0) if column in stored.columns else 0
+        if ((actions != 0) & (actions != known)).any():
+            print(f"  {ticker}: new {column.lower()} detected, backfilling")
+            return None
+    return pd.concat([stored[stored.index < new.index[0]], new])
+
+
+def load_history(ticker, days=DEFAULT_LOOKBACK_DAYS):
+    """
+    Return the stored daily history for ticker covering at least the last `days` calendar days.
+    Today's copy is served as-is; an older copy is brought up to date by fetching only the
+    bars after its last stored date (plus older bars if the window grew). Corporate-action
+    adjustments trigger a full refetch of that ticker. Fetch errors propagate.
+    Safe to call from multiple threads.
+    """
+    with _ticker_lock(ticker):
+        return _load_history(ticker, days)
+
+
+def _load_history(ticker, days):
+    start = datetime.now().date() - timedelta(days=max(days, DEFAULT_LOOKBACK_DAYS))
+    entry = _load_index().get(ticker)
+    if _is_fresh(ticker, start):
+        if ticker not in _FRAMES:
+            stored = _read_store(ticker)
+            if stored is not None or entry.get('rows', 0) == 0:
+                _FRAMES[ticker] = stored if stored is not None else pd.DataFrame()
+        if ticker in _FRAMES:
+            STATS['hits'] += 1
+            return _FRAMES[ticker]
+
+    stored = _stored_frame(ticker) if entry is not None else None
+    if stored is None or stored.empty:
+        data = _fetch(ticker, start)
+        STATS['full_fetches'] += 1
+    else:
+        stored_start = datetime.strptime(entry['start'], '%Y-%m-%d').date()
+        if start < stored_start:
+            # Window grew: fetch only the missing older bars
+            older = _fetch(ticker, start, end=stored_start)
+            stored = pd.concat([older, stored[stored.index >= pd.Timestamp(stored_start)]])
+        else:
+            start = stored_start
+        data = _merge_incremental(ticker, stored, _fetch(ticker, _anchor_date(stored)))
+        STATS['incremental_fetches'] += 1
+        if data is None:
+            data = _fetch(ticker, start)
+            STATS['backfills'] += 1
+    _store_frame(ticker, data, start)
+    _save_index()
+    return data
+
+
+def _store_frame(ticker, data, start):
+    if not data.empty:
+        data.to_parquet(_store_path(ticker))
+    with _INDEX_LOCK:
+        _FRAMES[ticker] = data
+        _load_index()[ticker] = {
+            'fetched_on': datetime.now().date().isoformat(),
+            'start': start.isoformat(),
+            'rows': len(data),
+            'last_date': data.index[-1].date().isoformat() if not data.empty else None,
+        }
+
+
+def _is_fresh(ticker, start):
+    entry = _load_index().get(ticker)
+    return (
+        entry is not None
+        and entry.get('fetched_on') == datetime.now().date().isoformat()
+        and entry.get('start') <= start.isoformat()
+    )
+
+
+def _split_download(raw, tickers):
+    """Split a yf.download frame into {ticker: OHLCV frame}, handling flat and MultiIndex columns."""
+    frames = {}
+    if raw is None or raw.empty:
+        return frames
+    if not isinstance(raw.columns, pd.MultiIndex):
+        if len(tickers) == 1:
+            frames[tickers[0]] = raw
+        return frames
+    level = 0 if set(tickers) & set(raw.columns.get_level_values(0)) else 1
+    for ticker in tickers:
+        if ticker in raw.columns.get_level_values(level):
+            frames[ticker] = raw.xs(ticker, axis=1, level=level)
+    return frames
+
+
+def _download(chunk, start, end):
+    task_pool.throttle('yahoo')
+    raw = yf.download(chunk, start=start, end=end, group_by='ticker',
+                      auto_adjust=True, threads=True, progress=False)
+    frames = _split_download(raw, chunk)
+    result = {}
+    for ticker in chunk:
+        data = frames.get(ticker)
+        if data is not None and 'Close' in data.columns:
+            data = data.dropna(subset=['Close'])
+        result[ticker] = _normalize(data)
+    return result
+
+
+def _updatable(ticker, start):
+    """Stored frame for ticker if it already covers start and only needs newer bars, else None."""
+    entry = _load_index().get(ticker)
+    if entry is None or not entry.get('rows') or entry.get('start') > start.isoformat():
+        return None
+    stored = _stored_frame(ticker)
+    return stored if stored is not None and not stored.empty else None
+
+
+def prefetch(tickers, days=DEFAULT_LOOKBACK_DAYS, chunk_size=50):
+    """
+    Bulk-download history for many tickers with yf.download in chunks of `chunk_size`
+    and seed the store, skipping tickers already fresh for today.
+    Tickers with a usable stored copy are downloaded only from their last stored bars
+    and appended; the rest get the full window. Symbols missing from the bulk result
+    (or from a failed chunk) fall back to a single per-ticker fetch through load_history.
+    Returns wide (close, volume) DataFrames indexed by date with one column per ticker.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    start = datetime.now().date() - timedelta(days=max(days, DEFAULT_LOOKBACK_DAYS))
+    pending = [t for t in tickers if not _is_fresh(t, start)]
+    end = datetime.now() + timedelta(days=1)
+    stored = {t: _updatable(t, start) for t in pending}
+    update = [t for t in pending if stored[t] is not None]
+    full = [t for t in pending if stored[t] is None]
+    failed = []
+
+    for i in range(0, len(update), chunk_size):
+        chunk = update[i:i + chunk_size]
+        anchor = min(_anchor_date(stored[t]) for t in chunk)
+        print(f"  Updating prices for {len(chunk)} tickers since {anchor.date()} "
+              f"({i + 1}-{i + len(chunk)} of {len(update)})...")
+        try:
+            frames = _download(chunk, anchor, end)
+        except Exception as e:
+            print(f"  Warning: Bulk update failed for chunk starting {chunk[0]}: {e}")
+            continue
+        for ticker in chunk:
+            if frames[ticker].empty:
+                failed.append(ticker)
+                continue
+            data = _merge_incremental(ticker, stored[ticker], frames[ticker])
+            STATS['incremental_fetches'] += 1
+            if data is None:
+                full.append(ticker)
+                continue
+            entry = _load_index()[ticker]
+            _store_frame(ticker, data, datetime.strptime(entry['start'], '%Y-%m-%d').date())
+
+    for i in range(0, len(full), chunk_size):
+        chunk = full[i:i + chunk_size]
+        print(f"  Downloading prices for {len(chunk)} tickers ({i + 1}-{i + len(chunk)} of {len(full)})...")
+        try:
+            frames = _download(chunk, start, end)
+        except Exception as e:
+            print(f"  Warning: Bulk download failed for chunk starting {chunk[0]}: {e}")
+            continue
+        for ticker in chunk:
+            if frames[ticker].empty:
+                failed.append(ticker)
+                continue
+            STATS['full_fetches'] += 1
+            if stored.get(ticker) is not None:
+                STATS['backfills'] += 1
+            _store_frame(ticker, frames[ticker], start)
+    _save_index()
+    if failed:
+        print(f"  No bulk price data for: {', '.join(failed)} (retrying individually)")
+
+    close, volume = {}, {}
+    for ticker in tickers:
+        try:
+            data = load_history(ticker, days)
+        except Exception as e:
+            print(f"  Warning: Could not load prices for {ticker}: {e}")
+            continue
+        if data.empty:
+            continue
+        close[ticker] = data['Close']
+        if 'Volume' in data.columns:
+            volume[ticker] = data['Volume']
+    empty = pd.DataFrame(index=pd.DatetimeIndex([], name='Date'))
+    close_df = pd.DataFrame(close).sort_index() if close else empty
+    volume_df = pd.DataFrame(volume).sort_index() if volume else empty.copy()
+    cutoff = pd.Timestamp(start)
+    return close_df[close_df.index >= cutoff], volume_df[volume_df.index >= cutoff]
+
+
+def get_history(ticker, start=None, end=None, period=None):
+    """
+    Drop-in replacement for yf.Ticker(ticker).history(start=..., end=...) / history(period=...).
+    Returns a (possibly empty) DataFrame sliced from the local store.
+    """
+    now = datetime.now()
+    if period is not None:
+        start = now - timedelta(days=parse_period(period))
+    if start is None:
+        start = now - timedelta(days=DEFAULT_LOOKBACK_DAYS)
+    if end is None:
+        end = now
+    start = pd.Timestamp(start).normalize()
+    end = pd.Timestamp(end)
+    days = (pd.Timestamp(now).normalize() - start).days + 1
+    data = load_history(ticker, days)
+    if data.empty:
+        return data
+    return data[(data.index >= start) & (data.index <= end)]
+
+
+def get_close(ticker, start=None, end=None, period=None):
+    """Close-price Series for ticker over the requested window."""
+    data = get_history(ticker, start=start, end=end, period=period)
+    if data.empty:
+        return pd.Series(dtype=float)
+    return data['Close']
+
+
+def clear_memory_cache():
+    """Drop in-process frames so the next lookup re-reads the on-disk store."""
+    _FRAMES.clear()
+
+
+def print_stats():
+    print(f"Price store: {STATS['hits']} served from store, {STATS['incremental_fetches']} incremental updates, "
+          f"{STATS['full_fetches']} full fetches, {STATS['backfills']} corporate-action backfills")
@@ -0,0 +1,190 @@
+import atexit
+import csv
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+# Background writer for LLM request records. Callers hand rows and log text to an
+# in-memory queue and return immediately; one thread appends them to the CSV and
+# text logs in batches (each file opened once per batch) and drains the queue at exit.
+# Files are only up to date after flush(): call it before reading llm_response_record.csv
+# in the same process. A write that keeps failing is retried with later batches and
+# reported by flush() as RecordWriteError, never dropped.
+
+OUTPUT_DIR = os.path.join(os.path.dirname(__file__), 'output')
+os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+FLUSH_INTERVAL = 1.0  # seconds a batch may wait before it is written
+MAX_BATCH = 500       # queued submissions written at once
+WRITE_ATTEMPTS = 3    # tries per file and batch before the write is kept for the next batch
+RETRY_BACKOFF = 0.5   # seconds before the second try, doubled after each
+
+# Optional compact columnar copy of every CSV row: one Parquet part file per flush.
+COMPACT_LOG = False
+COMPACT_LOG_DIR = os.path.join(OUTPUT_DIR, 'llm_response_log')
+
+_WRITER = None
+_WRITER_LOCK = threading.Lock()
+
+
+class RecordWriteError(Exception):
+    """Queued records could not be written; they are kept and retried with the next batch."""
+
+
+class RecordWriter:
+    """Queue-backed writer thread for CSV rows and text log entries."""
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL, max_batch=MAX_BATCH, compact_dir=None):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.compact_dir = compact_dir
+        self.stats = {'flushes': 0, 'rows': 0, 'errors': 0}
+        self.error = None
+        self._unwritten = []  # (kind, target, data) writes that failed every attempt
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='record-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, rows, csv_paths=(), header=None, logf=None, log_text=''):
+        """Queue rows for every path in csv_paths (header written to new files) and log_text for logf."""
+        self._queue.put(('write', (rows, tuple(csv_paths), header, logf, log_text)))
+
+    def flush(self):
+        """
+        Block until everything submitted so far has been written; raises RecordWriteError
+        if some of it could not be (it stays queued for the next attempt).
+        """
+        done = threading.Event()
+        self._queue.put(('flush', done))
+        done.wait()
+        self._raise_unwritten()
+
+    def close(self):
+        if self._thread.is_alive():
+            done = threading.Event()
+            self._queue.put(('stop', done))
+            done.wait()
+            self._thread.join()
+        self._raise_unwritten()
+
+    def _raise_unwritten(self):
+        if self._unwritten:
+            targets = sorted({str(getattr(target, 'name', target)) for _, target, _ in self._unwritten})
+            raise RecordWriteError(f"{len(self._unwritten)} LLM record writes to {targets} failed: {self.error}")
+
+    def _run(self):
+        while True:
+            batch, markers = [], []
+            kind, payload = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if kind == 'write':
+                    batch.append(payload)
+                else:
+                    markers.append((kind, payload))
+                    break
+                if len(batch) >= self.max_batch:
+                    break
+                try:
+                    kind, payload = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if batch or self._unwritten:
+                self._write(batch)
+            for kind, done in markers:
+                done.set()
+                if kind == 'stop':
+                    return
+
+    def _write(self, batch):
+        # One write per CSV file, log file and compact part; earlier failed writes go first
+        rows_by_path, headers, logs = {}, {}, {}
+        for rows, csv_paths, header, logf, log_text in batch:
+            for path in csv_paths:
+                rows_by_path.setdefault(path, []).extend(rows)
+                headers.setdefault(path, header)
+            if logf is not None and log_text:
+                logs.setdefault(id(logf), [logf, []])[1].append(log_text)
+        writes, self._unwritten = self._unwritten, []
+        writes += [('csv', path, (headers[path], rows)) for path, rows in rows_by_path.items()]
+        writes += [('log', logf, ''.join(texts)) for logf, texts in logs.values()]
+        if self.compact_dir and rows_by_path:
+            writes.append(('compact', self.compact_dir, batch))
+        for kind, target, data in writes:
+            # Each write is retried on its own, so a file that was written is never written twice
+            for attempt in range(WRITE_ATTEMPTS):
+                try:
+                    self._write_one(kind, target, data)
+                    break
+                except Exception as e:
+                    self.stats['errors'] += 1
+                    self.error = e
+                    if attempt + 1 < WRITE_ATTEMPTS:
+                        time.sleep(RETRY_BACKOFF * (2 ** attempt))
+            else:
+                print(f"Warning: Could not write LLM records to {getattr(target, 'name', target)} "
+                      f"({self.error}); keeping them to retry with the next batch.")
+                self._unwritten.append((kind, target, data))
+        self.stats['flushes'] += 1
+
+    def _write_one(self, kind, target, data):
+        if kind == 'csv':
+            header, rows = data
+            size = os.path.getsize(target) if os.path.exists(target) else 0
+            try:
+                with open(target, 'a', newline='', encoding='utf-8') as handle:
+                    writer = csv.writer(handle)
+                    if header and size == 0:
+                        writer.writerow(header)
+                    writer.writerows(rows)
+            except Exception:
+                # Cut off a partly written record so the retry appends whole records only
+                if os.path.exists(target):
+                    os.truncate(target, size)
+                raise
+            self.stats['rows'] += len(rows)
+        elif kind == 'log':
+            target.write(data)
+            target.flush()
+        else:
+            self._write_compact(data)
+
+    def _write_compact(self, batch):
+        import pandas as pd
+        frames = [pd.DataFrame(rows, columns=header) for rows, _, header, _, _ in batch if rows and header]
+        if not frames:
+            return
+        os.makedirs(self.compact_dir, exist_ok=True)
+        name = f"part-{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.parquet"
+        pd.concat(frames, ignore_index=True).astype(str).to_parquet(os.path.join(self.compact_dir, name), index=False)
+
+
+def get_writer():
+    """Process-wide RecordWriter, started on first use (COMPACT_LOG is read at that point)."""
+    global _WRITER
+    with _WRITER_LOCK:
+        if _WRITER is None:
+            _WRITER = RecordWriter(compact_dir=COMPACT_LOG_DIR if COMPACT_LOG else None)
+        return _WRITER
+
+
+def flush():
+    """Wait until every queued record is on disk (no-op if nothing was ever queued); raises RecordWriteError."""
+    with _WRITER_LOCK:
+        writer = _WRITER
+    if writer is not None:
+        writer.flush()
+
+
+def shutdown():
+    """Write everything still queued and stop the writer thread."""
+    global _WRITER
+    with _WRITER_LOCK:
+        writer, _WRITER = _WRITER, None
+    if writer is not None:
+        writer.close()
+
+
+atexit.register(shutdown)
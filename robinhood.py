@@ -1,15 +1,33 @@
 import robin_stocks as r
 import pandas as pd
-import yfinance as yf
 import json
 from cryptography.fernet import Fernet
-import numpy as np
 import os
 import glob
+import queue
+import threading
+import ollama_client
+import portfolio_risk
+import price_history
+import record_writer
+import sentiment_cache
+import task_pool
+import ticker_info
+from db_schema import SKIPPED_VOTE
+from scipy.stats import linregress
 
 OUTPUT_DIR = os.path.join(os.path.dirname(__file__), 'output')
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+SENTIMENT_MODELS = ["gemma3:1b", "mistral:7b", "llama3.2:latest"]
+#SENTIMENT_MODELS = ["gemma3:1b", "mistral:7b", "llama3.2:latest","gemma3n:latest","gpt-oss:20b"]
+SENTIMENT_LABELS = ("positive", "negative", "neutral")
+SENTIMENT_PROMPT = "Analyze the following news for sentiment (positive, negative, neutral) for the stock {symbol}. Respond with one word: positive, negative, or neutral.\nNews: {headline} {summary}"
+SENTIMENT_BATCH_PROMPT = "Analyze each of the following {count} numbered news items for sentiment (positive, negative, neutral) for the stock {symbol}. Respond with only a JSON array of {count} strings, one label per item in order, each one of: positive, negative, neutral.\nNews:\n{news}"
+# Headlines per batched request; tune against accuracy (1 disables batching)
+SENTIMENT_BATCH_SIZE = 5
+LLM_RECORD_HEADER = ["Symbol", "Model", "Request Time", "Prompt", "Response Time", "Analysis", "Majority", "Exec Time (s)"]
+
 def get_latest_holdings_csv():
     """
     Returns the path to the latest holdings_report_open_stock_positions_yyyymmdd.csv file,
@@ -25,60 +43,125 @@ def get_latest_holdings_csv():
     print(f"No dated open stock positions file found. Using fallback: {fallback}")
     return fallback
 
-def get_latest_news_file():
+def majority_vote(responses):
     """
-    Returns the path to the latest robin-news_*.txt file, or None if not found.
+    Majority label among valid responses; a single valid label wins outright.
+    If there is no majority (or no valid label), returns the last model's response.
     """
-    pattern = os.path.join(OUTPUT_DIR, "robin-news_*.txt")
-    files = glob.glob(pattern)
-    if files:
-        latest_file = max(files, key=os.path.getmtime)
-        print(f"Found previous news file: {latest_file}")
-        return latest_file
-    print("No previous news file found. All items will be analyzed.")
-    return None
+    from collections import Counter
+    filtered = [resp for resp in responses if resp in SENTIMENT_LABELS]
+    if filtered:
+        most_common = Counter(filtered).most_common()
+        if len(most_common) == 1 or most_common[0][1] > 1:
+            return most_common[0][0]
+        return responses[-1]
+    return responses[-1] if responses else 'unknown'
+
+def record_time(timestamp):
+    """Request/response time for llm_response_record.csv, to the microsecond (MySQL DATETIME(6))."""
+    from datetime import datetime
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S.%f')
 
-def parse_previous_news(news_file_path):
+def call_ollama(symbol, model_id, prompt, ollama_url, raw=False):
     """
-    Parse a previous robin-news_*.txt file and extract headlines and URLs.
-    Returns a set of (headline, url) tuples for quick lookup.
+    One generate request. Returns (analysis, csv_row, log_text); csv_row has an empty Majority.
+    analysis is the lower-cased one-word answer, or the raw response text when raw=True.
     """
-    if not news_file_path or not os.path.exists(news_file_path):
-        return set()
-    
-    previous_items = set()
+    import time
+    start_time = time.time()
+    log = f"\n{'='*40}\nSYMBOL: {symbol}\nMODEL: {model_id}\nPROMPT:\n{prompt}\n"
+    req_time = record_time(start_time)
     try:
-        with open(news_file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-            # Split by symbol sections
-            sections = content.split('='*60)
-            for section in sections:
-                lines = section.strip().split('\n')
-                headline = None
-                url = None
-                for line in lines:
-                    if line.startswith('Headline: '):
-                        headline = line.replace('Headline: ', '').strip()
-                    elif line.startswith('URL: '):
-                        url = line.replace('URL: ', '').strip()
-                    # When we have both, add to set
-                    if headline and url:
-                        previous_items.add((headline, url))
-                        headline = None
-                        url = None
-        print(f"Loaded {len(previous_items)} previous news items for comparison.")
+        response = ollama_client.generate(ollama_url, model_id, prompt)
+        resp_time = record_time(time.time())
+        log += f"RESPONSE RAW:\n{response.text}\n"
+        if response.ok:
+            result = response.json()
+            analysis = result.get('response', '') if raw else result.get('response', '').strip().lower()
+        else:
+            analysis = 'unknown'
     except Exception as e:
-        print(f"Error parsing previous news file: {e}")
-    return previous_items
+        analysis = f'error: {e}'
+        resp_time = record_time(time.time())
+    exec_time = time.time() - start_time
+    return analysis, [symbol, model_id, req_time, prompt, resp_time, analysis, '', f"{exec_time:.3f}"], log
+
+def parse_batch_labels(text, count):
+    """
+    Extract the JSON array of labels from a batch answer. Returns a list of `count` labels,
+    or None if the answer has no parseable array, the wrong length, or an unknown label.
+    """
+    start, end = text.find('['), text.rfind(']')
+    if start < 0 or end < start:
+        return None
+    try:
+        labels = json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+    if not isinstance(labels, list) or len(labels) != count:
+        return None
+    labels = [str(label).strip().lower() for label in labels]
+    if any(label not in SENTIMENT_LABELS for label in labels):
+        return None
+    return labels
+
+def write_llm_records(csv_rows, log, logf, csv_log_path=None):
+    """
+    Queue rows for llm_response_record.csv (and csv_log_path) and the log text for logf on the
+    background record_writer; nothing is written on the caller's thread. Call record_writer.flush()
+    before closing logf or reading llm_response_record.csv (Accuracy and UpdateMySqlDB do so themselves).
+    """
+    # Always write to llm_response_record.csv in output folder
+    paths = [os.path.join(OUTPUT_DIR, 'llm_response_record.csv')]
+    # Write to CSV log if path provided (legacy/optional)
+    if csv_log_path:
+        paths.append(csv_log_path)
+    record_writer.get_writer().submit(csv_rows, paths, LLM_RECORD_HEADER, logf, log)
+
+def get_beta_and_trend(symbol):
+    """
+    Beta (from cached yfinance info) and 30-day slope trend (from the shared price store) for symbol.
+    Returns (beta, trend) with 'N/A' / 'error' on failure, matching the holdings CSV columns.
+    """
+    try:
+        beta = ticker_info.get_info(symbol, ['beta'])['beta']
+        if beta is None:
+            beta = 'N/A'
+    except Exception:
+        beta = 'N/A'
+    # Trend analysis (30-day slope)
+    try:
+        hist = price_history.get_close(symbol, period='30d')
+        if len(hist) >= 15:
+            x = range(len(hist))
+            y = hist.values
+            slope, _, _, _, _ = linregress(x, y)
+            threshold = 0.001 * y[0]  # 0.1% of starting price per day
+            if slope > threshold:
+                trend = 'uptrend'
+            elif slope < -threshold:
+                trend = 'downtrend'
+            else:
+                trend = 'sideways'
+        else:
+            trend = 'not enough data'
+    except Exception:
+        trend = 'error'
+    return beta, trend
 
 class RobinhoodPortfolio:
     def __init__(self, config_path='config.json'):
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-        self.username = config['username']
-        key = config['key'].encode()
-        fernet = Fernet(key)
-        self.password = fernet.decrypt(config['password'].encode()).decode()
+        """config_path=None creates an offline instance (no credentials) for analysis-only use, e.g. benchmarks."""
+        self.username = self.password = None
+        if config_path is not None:
+            with open(config_path, 'r') as f:
+                config = json.load(f)
+            self.username = config['username']
+            key = config['key'].encode()
+            fernet = Fernet(key)
+            self.password = fernet.decrypt(config['password'].encode()).decode()
+        # (beta, trend) per symbol, shared by the download_* methods within one run
+        self.enrichment = {}
 
     def login(self):
         login = r.robinhood.authentication.login(self.username, self.password)
@@ -86,6 +169,27 @@ class RobinhoodPortfolio:
             raise Exception('Login failed. Please check your credentials.')
         return login
 
+    def enrich_symbols(self, symbols, max_workers=task_pool.DEFAULT_MAX_WORKERS):
+        """
+        Look up beta and trend for every symbol not already enriched in this run,
+        concurrently, and return {symbol: (beta, trend)} for the requested symbols.
+        """
+        missing = [s for s in dict.fromkeys(symbols) if s not in self.enrichment]
+        if missing:
+            print(f"Fetching beta and trend for {len(missing)} symbols...")
+            price_history.prefetch(missing)
+            results = task_pool.run_in_pool(get_beta_and_trend, missing, max_workers=max_workers)
+            for symbol, result in zip(missing, results):
+                self.enrichment[symbol] = result if result is not None else ('N/A', 'error')
+            ticker_info.save()
+        return {s: self.enrichment[s] for s in symbols}
+
+    def add_beta_and_trend(self, rows):
+        """Fill the Beta and Trend columns of holdings rows in place."""
+        enrichment = self.enrich_symbols([row['Symbol'] for row in rows])
+        for row in rows:
+            row['Beta'], row['Trend'] = enrichment[row['Symbol']]
+
     def download_holdings(self, output_csv=None):
         self.login()
         holdings = r.robinhood.account.build_holdings()
@@ -97,31 +201,6 @@ class RobinhoodPortfolio:
             output_csv = os.path.join(OUTPUT_DIR, 'holdings_report.csv')
         for symbol, info in holdings.items():
             print(f"{symbol}: {info['quantity']} shares @ ${info['price']} each, Equity: ${info['equity']}")
-            # Fetch beta using yfinance
-            try:
-                ticker = yf.Ticker(symbol)
-                beta = ticker.info.get('beta', 'N/A')
-            except Exception:
-                beta = 'N/A'
-            # Trend analysis (30-day slope)
-            try:
-                hist = yf.Ticker(symbol).history(period='30d')['Close']
-                if len(hist) >= 15:
-                    from scipy.stats import linregress
-                    x = range(len(hist))
-                    y = hist.values
-                    slope, _, _, _, _ = linregress(x, y)
-                    threshold = 0.001 * y[0]  # 0.1% of starting price per day
-                    if slope > threshold:
-                        trend = 'uptrend'
-                    elif slope < -threshold:
-                        trend = 'downtrend'
-                    else:
-                        trend = 'sideways'
-                else:
-                    trend = 'not enough data'
-            except Exception:
-                trend = 'error'
             data.append({
                 'Symbol': symbol,
                 'Quantity': info['quantity'],
@@ -129,9 +208,8 @@ class RobinhoodPortfolio:
                 'Equity': info['equity'],
                 'Percent Change': info['percent_change'],
                 'Type': info['type'],
-                'Beta': beta,
-                'Trend': trend
             })
+        self.add_beta_and_trend(data)
         df = pd.DataFrame(data)
         df.to_csv(output_csv, index=False)
         print(f"Holdings exported to {output_csv} with Beta and Trend columns.")
@@ -163,31 +241,6 @@ class RobinhoodPortfolio:
             quantity = pos.get('quantity', '0')
             average_buy_price = pos.get('average_buy_price', '0')
             equity = float(quantity) * float(average_buy_price)
-            # Fetch beta using yfinance
-            try:
-                ticker = yf.Ticker(symbol)
-                beta = ticker.info.get('beta', 'N/A')
-            except Exception:
-                beta = 'N/A'
-            # Trend analysis (30-day slope)
-            try:
-                hist = yf.Ticker(symbol).history(period='30d')['Close']
-                if len(hist) >= 15:
-                    from scipy.stats import linregress
-                    x = range(len(hist))
-                    y = hist.values
-                    slope, _, _, _, _ = linregress(x, y)
-                    threshold = 0.001 * y[0]  # 0.1% of starting price per day
-                    if slope > threshold:
-                        trend = 'uptrend'
-                    elif slope < -threshold:
-                        trend = 'downtrend'
-                    else:
-                        trend = 'sideways'
-                else:
-                    trend = 'not enough data'
-            except Exception:
-                trend = 'error'
             data.append({
                 'Symbol': symbol,
                 'Quantity': quantity,
@@ -195,9 +248,8 @@ class RobinhoodPortfolio:
                 'Equity': equity,
                 'Percent Change': pos.get('percent_change', 'N/A'),
                 'Type': pos.get('type', 'N/A'),
-                'Beta': beta,
-                'Trend': trend
             })
+        self.add_beta_and_trend(data)
         df = pd.DataFrame(data)
         df.to_csv(output_csv, index=False)
         print(f"Holdings (all positions) exported to {output_csv} with Beta and Trend columns.")
@@ -246,31 +298,6 @@ class RobinhoodPortfolio:
             quantity = pos.get('quantity', '0')
             average_buy_price = pos.get('average_buy_price', '0')
             equity = float(quantity) * float(average_buy_price)
-            # Fetch beta using yfinance
-            try:
-                ticker = yf.Ticker(symbol)
-                beta = ticker.info.get('beta', 'N/A')
-            except Exception:
-                beta = 'N/A'
-            # Trend analysis (30-day slope)
-            try:
-                hist = yf.Ticker(symbol).history(period='30d')['Close']
-                if len(hist) >= 15:
-                    from scipy.stats import linregress
-                    x = range(len(hist))
-                    y = hist.values
-                    slope, _, _, _, _ = linregress(x, y)
-                    threshold = 0.001 * y[0]  # 0.1% of starting price per day
-                    if slope > threshold:
-                        trend = 'uptrend'
-                    elif slope < -threshold:
-                        trend = 'downtrend'
-                    else:
-                        trend = 'sideways'
-                else:
-                    trend = 'not enough data'
-            except Exception:
-                trend = 'error'
             data.append({
                 'Symbol': symbol,
                 'Quantity': quantity,
@@ -278,9 +305,8 @@ class RobinhoodPortfolio:
                 'Equity': equity,
                 'Percent Change': pos.get('percent_change', 'N/A'),
                 'Type': pos.get('type', 'N/A'),
-                'Beta': beta,
-                'Trend': trend
             })
+        self.add_beta_and_trend(data)
         df = pd.DataFrame(data)
         df.to_csv(output_csv, index=False)
         print(f"Open stock positions exported to {output_csv} with Beta and Trend columns (all accounts combined).")
@@ -305,133 +331,207 @@ class RobinhoodPortfolio:
                 f.write(f"{row['Symbol']}: {row['Weight']:.4f} * {row['Beta']:.4f} = {row['Weight']*row['Beta']:.4f}\n")
             f.write(f"\nPortfolio Beta: {portfolio_beta:.4f}\n")
         # Standard deviation based risk
-        returns = []
-        symbols = df['Symbol'].tolist()
-        valid_symbols = []
-        for symbol in symbols:
-            try:
-                data = yf.Ticker(symbol).history(period='1y')['Close']
-                ret = data.pct_change().dropna()
-                if not ret.empty:
-                    returns.append(ret)
-                    valid_symbols.append(symbol)
-            except Exception:
-                returns.append(pd.Series(dtype=float))
-        if not returns or not valid_symbols:
+        weights = portfolio_risk.aggregate_weights(df)
+        risk = portfolio_risk.portfolio_risk(weights)
+        if 'sample' not in risk:
             print("No valid returns data for risk calculation.")
             return portfolio_beta, None
-        returns_df = pd.concat(returns, axis=1)
-        returns_df.columns = valid_symbols
-        # Only use weights for valid symbols
-        weights = df.set_index('Symbol').loc[valid_symbols, 'Weight'].values
-        cov_matrix = returns_df.cov()
-        if cov_matrix.shape[0] != len(weights):
-            print("Covariance matrix and weights shape mismatch. Skipping std calculation.")
-            portfolio_std = None
-        else:
-            portfolio_var = np.dot(weights.T, np.dot(cov_matrix, weights))
-            portfolio_std = np.sqrt(portfolio_var)
-            with open(os.path.join(OUTPUT_DIR, 'portfolio_std.txt'), 'w') as f:
-                f.write('Portfolio Standard Deviation Calculation Details\n')
-                f.write('----------------------------------------------\n')
-                f.write('Weights:\n')
-                for symbol, weight in zip(valid_symbols, weights):
-                    f.write(f"{symbol}: {weight:.4f}\n")
-                f.write('\nCovariance Matrix:\n')
-                f.write(cov_matrix.to_string())
-                f.write(f"\n\nPortfolio Variance: {portfolio_var:.8f}\n")
-                f.write(f"Portfolio Standard Deviation (annualized): {portfolio_std:.4%}\n")
+        portfolio_std = risk['sample']['annual_vol']
+        with open(os.path.join(OUTPUT_DIR, 'portfolio_std.txt'), 'w') as f:
+            f.write('Portfolio Standard Deviation Calculation Details\n')
+            f.write('----------------------------------------------\n')
+            f.write(f"Daily returns: {risk['observations']} aligned observations, {len(risk['symbols'])} symbols\n")
+            if risk['excluded']:
+                f.write(f"Excluded (insufficient history): {', '.join(risk['excluded'])}\n")
+            for method in portfolio_risk.COVARIANCE_METHODS:
+                f.write(f"\n[{method}] Portfolio Variance (daily): {risk[method]['variance']:.8f}\n")
+                f.write(f"[{method}] Portfolio Standard Deviation (annualized): {risk[method]['annual_vol']:.4%}\n")
+            contributions = pd.DataFrame({
+                'Symbol': risk['symbols'],
+                'Weight': risk['weights'],
+                'Marginal': risk['sample']['marginal'],
+                'Component': risk['sample']['component'],
+                'Percent of Risk': risk['sample']['percent'],
+            }).sort_values('Component', ascending=False)
+            f.write('\nRisk Contributions (sample covariance, annualized):\n')
+            f.write(contributions.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+            f.write('\n')
         print("Portfolio risk metrics exported to portfolio_beta.txt and portfolio_std.txt.")
         return portfolio_beta, portfolio_std
 
-    def analyze_sentiment_with_ollama(self, symbol, headline, summary, ollama_url, logf, models=None, csv_log_path=None):
+    def analyze_sentiment_with_ollama(self, symbol, headline, summary, ollama_url, logf, models=None, csv_log_path=None, concurrent=True, early_exit=False, use_cache=True):
+        """
+        Returns the majority sentiment for a news item; see analyze_sentiment_votes (records are
+        written in the background: call record_writer.flush() before reading llm_response_record.csv).
         """
-        Call Ollama API sequentially for multiple model ids for a news item. Logs request, response, and timing to a CSV file.
-        Returns the majority sentiment out of the 3 calls. If all 3 are different, returns the last call's response.
+        majority_response, _ = self.analyze_sentiment_votes(symbol, headline, summary, ollama_url, logf, models, csv_log_path,
+                                                            concurrent=concurrent, early_exit=early_exit, use_cache=use_cache)
+        return majority_response
+
+    def analyze_sentiment_votes(self, symbol, headline, summary, ollama_url, logf, models=None, csv_log_path=None, concurrent=True, early_exit=False, use_cache=True):
+        """
+        Call Ollama API for multiple model ids for a news item. Logs request, response, and timing to a CSV file.
+        With concurrent=True all models are queried in parallel over a pooled keep-alive session;
+        otherwise they are called one after another. Log entries and CSV rows keep model order either way.
+        With early_exit=True models are called in the smallest waves that could decide the vote and the
+        rest are skipped once a strict majority exists; skipped models get an Analysis of 'skipped'.
+        With use_cache=True answers stored in sentiment_cache by any earlier run are reused and
+        only the missing models are called; CSV rows are written for actual calls only.
+        Returns (majority, from_cache): the majority sentiment out of the 3 calls (if all 3 are different,
+        the last call's response) and whether it was decided without calling any model.
+        CSV rows and log text are queued on record_writer and may not be on disk yet when this returns;
+        record_writer.flush() waits for them (and raises RecordWriteError if they could not be written).
         """
-        import requests
         import time
-        import csv as pycsv
         from collections import Counter
+        from concurrent.futures import ThreadPoolExecutor
         if models is None:
-            models = ["gemma3:1b", "mistral:7b", "llama3.2:latest"]
-          #  models = ["gemma3:1b", "mistral:7b", "llama3.2:latest","gemma3n:latest","gpt-oss:20b"]
-        prompt = f"Analyze the following news for sentiment (positive, negative, neutral) for the stock {symbol}. Respond with one word: positive, negative, or neutral.\nNews: {headline} {summary}"
-        results = {}
-        responses = []
-        csv_rows = []
-        for model_id in models:
-            start_time = time.time()
-            req_payload = {"model": model_id, "prompt": prompt, "stream": False}
-            logf.write(f"\n{'='*40}\nSYMBOL: {symbol}\nMODEL: {model_id}\nPROMPT:\n{prompt}\n")
-            req_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(start_time))
-            try:
-                response = requests.post(ollama_url, json=req_payload)
-                resp_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))
-                logf.write(f"RESPONSE RAW:\n{response.text}\n")
-                if response.ok:
-                    result = response.json()
-                    analysis = result.get('response', '').strip().lower()
-                else:
-                    analysis = 'unknown'
-            except Exception as e:
-                analysis = f'error: {e}'
-                resp_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))
-            exec_time = time.time() - start_time
-            results[model_id] = analysis
-            responses.append(analysis)
-            # majority_response will be determined after all responses are collected
-            csv_rows.append([
-                symbol,
-                model_id,
-                req_time,
-                prompt,
-                resp_time,
-                analysis,
-                '',  # placeholder for majority, to be filled after loop
-                f"{exec_time:.3f}"
-            ])
-        # Determine majority response
-        filtered = [resp for resp in responses if resp in ("positive", "negative", "neutral")]
-        if filtered:
-            count = Counter(filtered)
-            most_common = count.most_common()
-            if len(most_common) == 1:
-                majority_response = most_common[0][0]
-            elif len(most_common) > 1 and most_common[0][1] > 1:
-                majority_response = most_common[0][0]
-            else:
-                majority_response = responses[-1]
-        else:
-            majority_response = responses[-1] if responses else 'unknown'
+            models = SENTIMENT_MODELS
+        prompt = SENTIMENT_PROMPT.format(symbol=symbol, headline=headline, summary=summary)
+
+        def call_models(model_ids):
+            if concurrent and len(model_ids) > 1:
+                with ThreadPoolExecutor(max_workers=len(model_ids)) as executor:
+                    return list(executor.map(lambda model_id: call_ollama(symbol, model_id, prompt, ollama_url), model_ids))
+            return [call_ollama(symbol, model_id, prompt, ollama_url) for model_id in model_ids]
 
+        by_model = {}
+        if use_cache:
+            cached = sentiment_cache.get_answers(symbol, headline, summary, models, SENTIMENT_PROMPT)
+            by_model = {model_id: (analysis, None, '') for model_id, analysis in cached.items()}
+        pending = [model_id for model_id in models if model_id not in by_model]
+        if early_exit:
+            # Call only as many models as could still decide the vote; stop once a label
+            # holds a strict majority of all models, since the rest cannot change it.
+            item_time = record_time(time.time())
+            needed = len(models) // 2 + 1
+            while pending:
+                count = Counter(a for a, _, _ in by_model.values() if a in SENTIMENT_LABELS)
+                top = count.most_common(1)[0][1] if count else 0
+                if top >= needed:
+                    break
+                wave, pending = pending[:needed - top], pending[needed - top:]
+                by_model.update(zip(wave, call_models(wave)))
+            for model_id in pending:
+                log = f"\n{'='*40}\nSYMBOL: {symbol}\nMODEL: {model_id}\nSKIPPED (majority already decided)\n"
+                by_model[model_id] = (SKIPPED_VOTE, [symbol, model_id, item_time, prompt, '', SKIPPED_VOTE, '', ''], log)
+        elif pending:
+            by_model.update(zip(pending, call_models(pending)))
+        outcomes = [by_model[model_id] for model_id in models]
+        majority_response = majority_vote([analysis for analysis, _, _ in outcomes])
+        from_cache = all(row is None or analysis == SKIPPED_VOTE for analysis, row, _ in outcomes)
+        if from_cache:
+            return majority_response, True
+        csv_rows = [row for _, row, _ in outcomes if row is not None]
         # Fill in majority response for all rows
         for row in csv_rows:
             row[6] = majority_response
+        for model_id, (analysis, row, _) in zip(models, outcomes):
+            if use_cache and row is not None:
+                sentiment_cache.put_answer(symbol, headline, summary, model_id, SENTIMENT_PROMPT, analysis)
+        write_llm_records(csv_rows, ''.join(log for _, _, log in outcomes), logf, csv_log_path)
+        return majority_response, False
 
-        # Always write to llm_response_record.csv in output folder
-        output_dir = os.path.join(os.path.dirname(__file__), 'output')
-        llm_csv_path = os.path.join(output_dir, 'llm_response_record.csv')
-        write_header = not os.path.exists(llm_csv_path)
-        with open(llm_csv_path, 'a', newline='', encoding='utf-8') as csvfile:
-            writer = pycsv.writer(csvfile)
-            if write_header:
-                writer.writerow(["Symbol", "Model", "Request Time", "Prompt", "Response Time", "Analysis", "Majority", "Exec Time (s)"])
-            writer.writerows(csv_rows)
-        # Write to CSV log if path provided (legacy/optional)
-        if csv_log_path:
-            write_header2 = not os.path.exists(csv_log_path)
-            with open(csv_log_path, 'a', newline='', encoding='utf-8') as csvfile:
-                writer = pycsv.writer(csvfile)
-                if write_header2:
-                    writer.writerow(["Symbol", "Model", "Request Time", "Prompt", "Response Time", "Analysis", "Majority", "Exec Time (s)"])
-                writer.writerows(csv_rows)
-        return majority_response
+    def analyze_sentiment_batch(self, symbol, items, ollama_url, logf, models=None, csv_log_path=None, batch_size=SENTIMENT_BATCH_SIZE, concurrent=True, use_cache=True):
+        """
+        Batched variant of analyze_sentiment_votes for several (headline, summary) items of one symbol.
+        Each model gets up to batch_size headlines per request in one numbered prompt and must answer
+        with a JSON array of labels; a batch whose answer does not parse or validate is re-sent one item
+        at a time. Rows are still written per item to llm_response_record.csv, with the batch's exec time
+        split evenly across its items and, as Prompt, the batch prompt that was sent followed by an
+        "Item: n" line naming the item the row's label answers. Items of one batch share its request
+        time; that line (PromptHash in MySQL's unique key) keeps their rows apart. Rows for items sent
+        on their own carry the single-item prompt. Early-exit voting is not applied. Cached answers are
+        kept under the template actually sent (batch or single-item); lookups try the batch template
+        first, then the single-item one.
+        Returns [(majority, from_cache), ...] in item order. Rows are written in the background, as in
+        analyze_sentiment_votes; call record_writer.flush() before reading them back.
+        """
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+        if models is None:
+            models = SENTIMENT_MODELS
+        batch_size = max(1, batch_size)
+        prompts = [SENTIMENT_PROMPT.format(symbol=symbol, headline=headline, summary=summary) for headline, summary in items]
+        # outcomes[i][model_id] = (analysis, row, log) as in analyze_sentiment_votes, plus the
+        # prompt template the answer came from (None when it was cached)
+        outcomes = [{} for _ in items]
+        if use_cache:
+            for i, (headline, summary) in enumerate(items):
+                cached = sentiment_cache.get_answers(symbol, headline, summary, models, SENTIMENT_BATCH_PROMPT,
+                                                     fallback_templates=(SENTIMENT_PROMPT,))
+                outcomes[i] = {model_id: (analysis, None, '', None) for model_id, analysis in cached.items()}
+
+        def run_model(model_id):
+            pending = [i for i in range(len(items)) if model_id not in outcomes[i]]
+            results = {}
+            for start in range(0, len(pending), batch_size):
+                batch = pending[start:start + batch_size]
+                if len(batch) == 1:
+                    results[batch[0]] = call_ollama(symbol, model_id, prompts[batch[0]], ollama_url) + (SENTIMENT_PROMPT,)
+                    continue
+                prompt = SENTIMENT_BATCH_PROMPT.format(
+                    symbol=symbol, count=len(batch),
+                    news='\n'.join(f"{n}. {items[i][0]} {items[i][1]}" for n, i in enumerate(batch, 1)))
+                start_time = time.time()
+                analysis, row, log = call_ollama(symbol, model_id, prompt, ollama_url, raw=True)
+                labels = parse_batch_labels(analysis, len(batch))
+                if labels is None:
+                    log += f"BATCH PARSE FAILED, retrying {len(batch)} items individually\n"
+                    for n, i in enumerate(batch):
+                        analysis, row, single_log = call_ollama(symbol, model_id, prompts[i], ollama_url)
+                        results[i] = (analysis, row, (log if n == 0 else '') + single_log, SENTIMENT_PROMPT)
+                    continue
+                share = (time.time() - start_time) / len(batch)
+                for n, (i, label) in enumerate(zip(batch, labels), 1):
+                    record = [symbol, model_id, row[2], f"{prompt}\nItem: {n}", row[4], label, '', f"{share:.3f}"]
+                    results[i] = (label, record, log if n == 1 else '', SENTIMENT_BATCH_PROMPT)
+            return model_id, results
 
-    def fetch_and_analyze_news(self, holdings_csv=None, news_output=None, ollama_url='http://localhost:11434/api/generate', ollama_log=None):
-        import requests
-        import json as pyjson
-        from datetime import datetime, timedelta, timezone
+        if concurrent and len(models) > 1:
+            with ThreadPoolExecutor(max_workers=len(models)) as executor:
+                per_model = list(executor.map(run_model, models))
+        else:
+            per_model = [run_model(model_id) for model_id in models]
+        for model_id, results in per_model:
+            for i, outcome in results.items():
+                outcomes[i][model_id] = outcome
+
+        votes = []
+        csv_rows = []
+        logs = []
+        for (headline, summary), by_model in zip(items, outcomes):
+            ordered = [by_model[model_id] for model_id in models]
+            majority_response = majority_vote([analysis for analysis, _, _, _ in ordered])
+            from_cache = all(row is None for _, row, _, _ in ordered)
+            votes.append((majority_response, from_cache))
+            for model_id, (analysis, row, log, template) in zip(models, ordered):
+                logs.append(log)
+                if row is None:
+                    continue
+                row[6] = majority_response
+                csv_rows.append(row)
+                if use_cache:
+                    sentiment_cache.put_answer(symbol, headline, summary, model_id, template, analysis)
+        if csv_rows:
+            write_llm_records(csv_rows, ''.join(logs), logf, csv_log_path)
+        return votes
+
+    def fetch_and_analyze_news(self, holdings_csv=None, news_output=None, ollama_url='http://localhost:11434/api/generate', ollama_log=None, early_exit=False,
+                               fetch_workers=task_pool.DEFAULT_MAX_WORKERS, llm_workers=ollama_client.MAX_PARALLEL_ITEMS, batch_size=1, use_cache=True):
+        """
+        Fetch news for every holding and write sentiment for recent items to robin-news_*.txt.
+        Runs as a staged pipeline: news for all symbols is fetched concurrently (fetch_workers),
+        each symbol's items are date-filtered and de-duplicated as soon as they arrive, then queued
+        to llm_workers sentiment workers through a bounded queue (so at most that many items are at
+        Ollama at once), while the report is written in holdings order as results complete.
+        With batch_size > 1 each queued job is up to batch_size items of one symbol, analyzed with
+        analyze_sentiment_batch (early_exit does not apply to batches). Items of one symbol run on
+        several workers at once; their records carry microsecond request times and differ by prompt,
+        so none share a unique key in MySQL.
+        """
+        from datetime import datetime, timezone
+        from concurrent.futures import Future, ThreadPoolExecutor, as_completed
         if holdings_csv is None:
             holdings_csv = get_latest_holdings_csv()
         df = pd.read_csv(holdings_csv)
@@ -441,58 +541,115 @@ class RobinhoodPortfolio:
             news_output = os.path.join(OUTPUT_DIR, f'robin-news_{timestamp}.txt')
         if ollama_log is None:
             ollama_log = os.path.join(OUTPUT_DIR, f'ollama_news_log_{timestamp}.txt')
-        
-        # Load previous news items for comparison
-        previous_news_file = get_latest_news_file()
-        previous_items = parse_previous_news(previous_news_file)
-        
+        symbols = list(dict.fromkeys(df['Symbol']))
+
+        def select_items(news_items):
+            """Items published in the last 4 days, de-duplicated by (headline, url)."""
+            selected = {}
+            for news in news_items:
+                published_at = news.get('published_at')
+                if not published_at:
+                    continue
+                try:
+                    pub_dt = datetime.fromisoformat(published_at.replace('Z', '+00:00'))
+                except Exception:
+                    try:
+                        pub_dt = datetime.strptime(published_at[:10], '%Y-%m-%d').replace(tzinfo=timezone.utc)
+                    except Exception:
+                        continue
+                if (now - pub_dt).days > 4:
+                    continue
+                headline = news.get('title', '')
+                summary = news.get('summary', '')
+                url = news.get('url', '')
+                selected.setdefault((headline, url), (headline, summary, url))
+            return list(selected.values())
+
+        # Stage 3: sentiment workers fed by a bounded queue; a full queue blocks the fetch stage
+        work = queue.Queue(maxsize=max(1, llm_workers) * 2)
+
+        def sentiment_worker(logf):
+            while True:
+                job = work.get()
+                if job is None:
+                    return
+                symbol, batch = job
+                try:
+                    if batch_size > 1:
+                        votes = self.analyze_sentiment_batch(symbol, [(headline, summary) for headline, summary, _ in batch],
+                                                             ollama_url, logf, batch_size=batch_size, use_cache=use_cache)
+                    else:
+                        votes = [self.analyze_sentiment_votes(symbol, headline, summary, ollama_url, logf, early_exit=early_exit, use_cache=use_cache)
+                                 for headline, summary, _ in batch]
+                    for (_, _, result), vote in zip(batch, votes):
+                        result.set_result(vote)
+                except Exception as e:
+                    for _, _, result in batch:
+                        result.set_exception(e)
+
+        # Stages 1-2: fetch news concurrently, filter each symbol as it arrives and enqueue its items
+        sections = {symbol: Future() for symbol in symbols}
+
+        def produce():
+            try:
+                with ThreadPoolExecutor(max_workers=max(1, fetch_workers)) as fetch_pool:
+                    fetches = {fetch_pool.submit(r.robinhood.stocks.get_news, symbol): symbol for symbol in symbols}
+                    for fetch in as_completed(fetches):
+                        symbol = fetches[fetch]
+                        try:
+                            news_items = fetch.result()
+                        except Exception as e:
+                            sections[symbol].set_exception(e)
+                            continue
+                        items = [(headline, summary, url, Future()) for headline, summary, url in select_items(news_items or [])]
+                        sections[symbol].set_result((news_items, items))
+                        jobs = [(headline, summary, result) for headline, summary, _, result in items]
+                        step = max(1, batch_size)
+                        for start in range(0, len(jobs), step):
+                            work.put((symbol, jobs[start:start + step]))
+            except Exception as e:
+                for section in sections.values():
+                    if not section.done():
+                        section.set_exception(e)
+            finally:
+                for _ in range(max(1, llm_workers)):
+                    work.put(None)
+
         new_items_count = 0
         reused_items_count = 0
         
         with open(news_output, 'w', encoding='utf-8') as f, open(ollama_log, 'w', encoding='utf-8') as logf:
+            workers = [threading.Thread(target=sentiment_worker, args=(logf,), daemon=True) for _ in range(max(1, llm_workers))]
+            producer = threading.Thread(target=produce, daemon=True)
+            for thread in workers + [producer]:
+                thread.start()
+
             f.write(f"News Analysis Report - {timestamp}\n")
-            f.write(f"Previous news file: {previous_news_file if previous_news_file else 'None'}\n")
-            f.write(f"Previous items loaded: {len(previous_items)}\n\n")
+            f.write(f"Sentiment cache: {sentiment_cache.CACHE_FILE}\n")
+            f.write(f"Cached answers loaded: {sentiment_cache.size()}\n\n")
             
-            for symbol in df['Symbol']:
+            # Stage 4: write sections in holdings order as their results complete
+            for symbol in symbols:
                 f.write(f"\n{'='*60}\n{symbol} News\n{'='*60}\n")
                 wrote_any = False
                 try:
-                    news_items = r.robinhood.stocks.get_news(symbol)
+                    news_items, items = sections[symbol].result()
                 except Exception as e:
                     f.write(f"Error fetching news for {symbol}: {e}\n")
                     continue
                 if not news_items:
                     f.write("No news found.\n")
                     continue
-                for news in news_items:
-                    # Filter by published date (last 4 days)
-                    published_at = news.get('published_at')
-                    if not published_at:
-                        continue
+                for headline, summary, url, result in items:
                     try:
-                        pub_dt = datetime.fromisoformat(published_at.replace('Z', '+00:00'))
-                    except Exception:
-                        try:
-                            pub_dt = datetime.strptime(published_at[:10], '%Y-%m-%d').replace(tzinfo=timezone.utc)
-                        except Exception:
-                            continue
-                    if (now - pub_dt).days > 4:
-                        continue
-                    headline = news.get('title', '')
-                    summary = news.get('summary', '')
-                    url = news.get('url', '')
-                    
-                    # Check if this is a new item
-                    item_key = (headline, url)
-                    is_new = item_key not in previous_items
-                    
-                    # Only analyze sentiment for NEW items
+                        analysis, cached = result.result()
+                    except Exception as e:
+                        analysis, cached = f'error: {e}', False
+                    # Items answered entirely from the sentiment cache count as previously seen
+                    is_new = not cached
                     if is_new:
-                        analysis = self.analyze_sentiment_with_ollama(symbol, headline, summary, ollama_url, logf)
                         new_items_count += 1
                     else:
-                        analysis = 'not analyzed (previously seen)'
                         reused_items_count += 1
                     
                     if analysis != 'neutral' or is_new:
@@ -502,19 +659,24 @@ class RobinhoodPortfolio:
                 if not wrote_any:
                     f.write("No positive or negative news found.\n")
             
+            producer.join()
+            for thread in workers:
+                thread.join()
+            # Records must be on disk before Accuracy / UpdateMySqlDB read llm_response_record.csv
+            record_writer.flush()
             # Write summary at the end
             f.write(f"\n\n{'='*60}\nSummary\n{'='*60}\n")
             f.write(f"New items analyzed: {new_items_count}\n")
             f.write(f"Previously seen items (not re-analyzed): {reused_items_count}\n")
+        sentiment_cache.save()
+        sentiment_cache.print_stats()
         
         print(f"News and sentiment analysis written to {news_output}.")
         print(f"New items analyzed: {new_items_count}, Previously seen: {reused_items_count}")
         print(f"Ollama requests/responses logged in {ollama_log}.")
 
     def analyze_trends(self, holdings_csv=None, trend_output=None, lookback_days=30):
-        import yfinance as yf
         from datetime import datetime
-        from scipy.stats import linregress
         import pandas as pd
         if holdings_csv is None:
             holdings_csv = get_latest_holdings_csv()
@@ -525,7 +687,7 @@ class RobinhoodPortfolio:
         with open(trend_output, 'w', encoding='utf-8') as f:
             for symbol in df['Symbol']:
                 try:
-                    data = yf.Ticker(symbol).history(period=f'{lookback_days}d')['Close']
+                    data = price_history.get_close(symbol, period=f'{lookback_days}d')
                     if len(data) < lookback_days // 2:
                         f.write(f"{symbol}: Not enough data for trend analysis.\n")
                         continue
@@ -0,0 +1,117 @@
+import atexit
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+# Persistent cache of per-model sentiment answers, keyed by a hash of
+# (symbol, headline, summary, model, prompt template). A headline analyzed in any
+# earlier run is answered from here instead of being sent to Ollama again.
+OUTPUT_DIR = os.path.join(os.path.dirname(__file__), 'output')
+os.makedirs(OUTPUT_DIR, exist_ok=True)
+CACHE_FILE = os.path.join(OUTPUT_DIR, 'sentiment_cache.json')
+
+# Least recently used answers are evicted beyond this many entries.
+MAX_ENTRIES = 50000
+
+# Only real labels are cached; errors and unparseable answers are retried next run.
+CACHEABLE = ("positive", "negative", "neutral")
+
+_CACHE = None
+_DIRTY = False
+_LOCK = threading.RLock()
+STATS = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+
+def cache_key(symbol, headline, summary, model, template):
+    payload = json.dumps([symbol, headline, summary, model, template], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _load():
+    global _CACHE
+    with _LOCK:
+        if _CACHE is None:
+            try:
+                with open(CACHE_FILE, 'r', encoding='utf-8') as handle:
+                    _CACHE = json.load(handle)
+            except Exception:
+                _CACHE = {}
+        return _CACHE
+
+
+def _evict():
+    if len(_CACHE) <= MAX_ENTRIES:
+        return
+    by_use = sorted(_CACHE, key=lambda k: _CACHE[k].get('last_used', ''))
+    stale = by_use[:len(_CACHE) - MAX_ENTRIES]
+    for key in stale:
+        del _CACHE[key]
+    STATS['evictions'] += len(stale)
+
+
+def save():
+    """Write the cache to disk if anything changed."""
+    global _DIRTY
+    with _LOCK:
+        if _CACHE is None or not _DIRTY:
+            return
+        _evict()
+        with open(CACHE_FILE, 'w', encoding='utf-8') as handle:
+            json.dump(_CACHE, handle)
+        _DIRTY = False
+
+
+atexit.register(save)
+
+
+def size():
+    with _LOCK:
+        return len(_load())
+
+
+def get_answers(symbol, headline, summary, models, template, fallback_templates=()):
+    """
+    Return {model: analysis} for the models whose answer to this item is cached under template,
+    or else under the first of fallback_templates that has one.
+    """
+    global _DIRTY
+    now = datetime.now().isoformat()
+    answers = {}
+    with _LOCK:
+        cache = _load()
+        for model in models:
+            entry = None
+            for candidate in (template,) + tuple(fallback_templates):
+                entry = cache.get(cache_key(symbol, headline, summary, model, candidate))
+                if entry is not None:
+                    break
+            if entry is None:
+                STATS['misses'] += 1
+                continue
+            STATS['hits'] += 1
+            entry['last_used'] = now
+            _DIRTY = True
+            answers[model] = entry['analysis']
+    return answers
+
+
+def put_answer(symbol, headline, summary, model, template, analysis):
+    """Store one model's answer; anything other than a CACHEABLE label is ignored."""
+    global _DIRTY
+    if analysis not in CACHEABLE:
+        return
+    with _LOCK:
+        _load()[cache_key(symbol, headline, summary, model, template)] = {
+            'analysis': analysis,
+            'last_used': datetime.now().isoformat(),
+        }
+        _DIRTY = True
+
+
+def print_stats():
+    total = STATS['hits'] + STATS['misses']
+    hit_rate = STATS['hits'] / total * 100 if total else 0
+    print(f"Sentiment cache: {STATS['hits']} hits, {STATS['misses']} misses ({hit_rate:.1f}% hit rate), "
+          f"{STATS['evictions']} evictions")
@@ -0,0 +1,79 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Bounded thread-pool execution for independent, I/O-bound per-ticker work.
+# Results always come back in input order so CSV output stays deterministic.
+
+DEFAULT_MAX_WORKERS = 8
+
+# Maximum requests per second allowed against each remote host.
+HOST_RATE_LIMITS = {
+    'yahoo': 8.0,
+}
+
+_LIMITERS = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+class RateLimiter:
+    """Thread-safe limiter that spaces calls at least 1/rate seconds apart."""
+
+    def __init__(self, rate_per_sec):
+        self.interval = 1.0 / rate_per_sec
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def throttle(host):
+    """Block until the next request to host is allowed by HOST_RATE_LIMITS."""
+    rate = HOST_RATE_LIMITS.get(host)
+    if not rate:
+        return
+    with _LIMITERS_LOCK:
+        limiter = _LIMITERS.get(host)
+        if limiter is None:
+            limiter = _LIMITERS[host] = RateLimiter(rate)
+    limiter.wait()
+
+
+def call_with_retry(func, *args, retries=2, backoff=1.0, **kwargs):
+    """Call func, retrying on exception with exponential backoff (backoff, 2*backoff, ...)."""
+    for attempt in range(retries + 1):
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(backoff * (2 ** attempt))
+
+
+def run_in_pool(func, items, max_workers=DEFAULT_MAX_WORKERS, retries=0, backoff=1.0):
+    """
+    Apply func to every item using at most max_workers threads and return the results
+    in the same order as items. A task that still raises after its retries yields None.
+    max_workers <= 1 runs serially in the calling thread.
+    Tasks are not retried by default: Yahoo requests already retry themselves where they are
+    made (price_history, ticker_info), and retrying the whole task as well would repeat a
+    failing request retries x retries times. Pass retries only for work that does not.
+    """
+    def run(item):
+        try:
+            return call_with_retry(func, item, retries=retries, backoff=backoff)
+        except Exception as e:
+            print(f"  Error processing {item}: {e}")
+            return None
+
+    items = list(items)
+    if max_workers is None or max_workers <= 1 or len(items) <= 1:
+        return [run(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(run, items))
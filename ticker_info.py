@@ -0,0 +1,154 @@
+import atexit
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+import yfinance as yf
+
+import task_pool
+
+# Disk-persisted cache for slow yf.Ticker(t).info lookups (names, AUM, beta).
+# Each field carries its own TTL; one .info request refreshes every tracked field.
+OUTPUT_DIR = os.path.join(os.path.dirname(__file__), 'output')
+os.makedirs(OUTPUT_DIR, exist_ok=True)
+CACHE_FILE = os.path.join(OUTPUT_DIR, 'ticker_info_cache.json')
+
+FIELD_TTLS = {
+    'longName': timedelta(days=30),
+    'shortName': timedelta(days=30),
+    'totalAssets': timedelta(days=1),
+    'beta': timedelta(days=1),
+}
+DEFAULT_TTL = timedelta(days=1)
+
+# Tickers not used for this long are evicted, and the cache never holds more than MAX_ENTRIES.
+EVICT_AFTER = timedelta(days=90)
+MAX_ENTRIES = 5000
+
+_CACHE = None
+_DIRTY = False
+_LOCK = threading.RLock()
+STATS = {'hits': 0, 'misses': 0, 'errors': 0, 'evictions': 0}
+
+
+def _load():
+    global _CACHE
+    with _LOCK:
+        if _CACHE is None:
+            try:
+                with open(CACHE_FILE, 'r', encoding='utf-8') as handle:
+                    _CACHE = json.load(handle)
+            except Exception:
+                _CACHE = {}
+            _evict()
+        return _CACHE
+
+
+def _evict():
+    cutoff = (datetime.now() - EVICT_AFTER).isoformat()
+    stale = [t for t, entry in _CACHE.items() if entry.get('last_used', '') < cutoff]
+    if len(_CACHE) - len(stale) > MAX_ENTRIES:
+        by_use = sorted(_CACHE, key=lambda t: _CACHE[t].get('last_used', ''))
+        stale = by_use[:len(_CACHE) - MAX_ENTRIES]
+    for ticker in stale:
+        del _CACHE[ticker]
+    STATS['evictions'] += len(stale)
+
+
+def save():
+    """Write the cache to disk if anything changed."""
+    global _DIRTY
+    with _LOCK:
+        if _CACHE is None or not _DIRTY:
+            return
+        _evict()
+        with open(CACHE_FILE, 'w', encoding='utf-8') as handle:
+            json.dump(_CACHE, handle, indent=1, sort_keys=True)
+        _DIRTY = False
+
+
+atexit.register(save)
+
+
+def _is_fresh(stored, ttl, now):
+    return stored is not None and now - datetime.fromisoformat(stored[1]) < ttl
+
+
+def get_value(ticker, field, fetch, ttl=DEFAULT_TTL, permanent=()):
+    """
+    Return the cached value of field for ticker, calling fetch() (retried with
+    task_pool.call_with_retry) when it is missing or older than ttl. Exceptions of the types in
+    permanent mean the ticker has no such value: they are not retried and None is cached for ttl.
+    If fetch still raises, a stale cached value is returned when one exists; otherwise the
+    exception propagates.
+    """
+    global _DIRTY
+    now = datetime.now()
+    with _LOCK:
+        entry = _load().setdefault(ticker, {'fields': {}})
+        entry['last_used'] = now.isoformat()
+        _DIRTY = True
+        stored = entry['fields'].get(field)
+        if _is_fresh(stored, ttl, now):
+            STATS['hits'] += 1
+            return stored[0]
+        STATS['misses'] += 1
+    def fetch_or_none():
+        try:
+            return fetch()
+        except permanent:
+            return None
+
+    try:
+        value = task_pool.call_with_retry(fetch_or_none)
+    except Exception:
+        with _LOCK:
+            STATS['errors'] += 1
+        if stored is not None:
+            return stored[0]
+        raise
+    with _LOCK:
+        entry['fields'][field] = [value, now.isoformat()]
+    return value
+
+
+def get_info(ticker, fields):
+    """
+    Return {field: value} for the requested yf .info fields, served from the cache when
+    every field is within its TTL. A single .info request refreshes all FIELD_TTLS fields.
+    """
+    global _DIRTY
+    now = datetime.now()
+    with _LOCK:
+        entry = _load().setdefault(ticker, {'fields': {}})
+        entry['last_used'] = now.isoformat()
+        _DIRTY = True
+        cached = entry['fields']
+        if all(_is_fresh(cached.get(f), FIELD_TTLS.get(f, DEFAULT_TTL), now) for f in fields):
+            STATS['hits'] += 1
+            return {f: cached[f][0] for f in fields}
+        STATS['misses'] += 1
+    def request():
+        task_pool.throttle('yahoo')
+        return yf.Ticker(ticker).info or {}
+
+    try:
+        info = task_pool.call_with_retry(request)
+    except Exception:
+        with _LOCK:
+            STATS['errors'] += 1
+        if all(f in cached for f in fields):
+            return {f: cached[f][0] for f in fields}
+        raise
+    with _LOCK:
+        for field in set(FIELD_TTLS) | set(fields):
+            cached[field] = [info.get(field), now.isoformat()]
+    return {f: info.get(f) for f in fields}
+
+
+def print_stats():
+    total = STATS['hits'] + STATS['misses']
+    hit_rate = STATS['hits'] / total * 100 if total else 0
+    print(f"Ticker info cache: {STATS['hits']} hits, {STATS['misses']} misses ({hit_rate:.1f}% hit rate), "
+          f"{STATS['errors']} errors, {STATS['evictions']} evictions")